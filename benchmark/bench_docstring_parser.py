@@ -0,0 +1,69 @@
+"""
+Compares DocstringParser with a naive regex-based parser on very long docstrings and on shared boilerplate
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import jdoc
+
+SECTIONS = ["Args", "Returns", "Raises"]
+
+
+def naive_render(text: str) -> str:
+    """Renders Google-style sections by searching the whole docstring with a regex per section and per item."""
+    output = text
+    for title in SECTIONS:
+        match = re.search(
+            r"^{}:\s*\n((?:^[ \t]+.*\n?|^\s*\n)+)".format(title), output, re.MULTILINE
+        )
+        if match is None:
+            continue
+        block = match.group(1)
+        items = re.findall(
+            r"^[ \t]+(\w+)(?:\s*\(([^)]*)\))?:\s*(.*(?:\n[ \t]{8,}.*)*)", block, re.MULTILINE
+        )
+        rows = ["| Name | Type | Description |", "| ---- | ---- | ----------- |"]
+        for name, type_, description in items:
+            description = re.sub(r"\s+", " ", description).strip()
+            rows.append("| `{}` | `{}` | {} |".format(name, type_, description))
+        output = output[: match.start()] + "**{}:**\n\n".format(title) + "\n".join(rows) + "\n" + output[match.end() :]
+    return output
+
+
+def long_docstring(arguments: int) -> str:
+    lines = ["Does something with a lot of arguments.", "", "Args:"]
+    for i in range(arguments):
+        lines.append("    arg_{} (int): Argument number {},".format(i, i))
+        lines.append("        which has a description over two lines.")
+    lines += ["", "Returns:", "    int: The result.", "", "Raises:", "    ValueError: Sometimes."]
+    return "\n".join(lines)
+
+
+def timed(func, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    for arguments in (100, 1000, 5000):
+        text = long_docstring(arguments)
+        naive = timed(lambda: naive_render(text), 3)
+        single_pass = timed(lambda: jdoc.DocstringParser().render(text), 3)
+        print(
+            "{:5} arguments: naive {:.3f} s, single pass {:.3f} s".format(
+                arguments, naive, single_pass
+            )
+        )
+
+    # 10000 methods sharing the same boilerplate docstring
+    text = long_docstring(20)
+    parser = jdoc.DocstringParser()
+    naive = timed(lambda: naive_render(text), 10000)
+    cached = timed(lambda: parser.render(text), 10000)
+    print("Shared docstring x10000: naive {:.3f} s, cached {:.3f} s".format(naive, cached))
@@ -0,0 +1,47 @@
+"""
+Compares documenting all submodules of a large package with excluding most of them by a glob pattern
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import jdoc
+import synthetic
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def imported(name: str) -> int:
+    return sum(1 for module in sys.modules if module.startswith(name + "."))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        name = "bench_filters_pkg"
+        package, = synthetic.generate(
+            directory, name, modules=1000, functions=20, classes=5, methods=5, import_modules=False
+        )
+        output = os.path.join(directory, "output.md")
+
+        # Keeps module_0 only. Runs first, so that the excluded modules have not been imported yet.
+        excluded, _ = timed(
+            lambda: jdoc.document(
+                [jdoc.IncludeChildren(package, submodules=True)],
+                output,
+                exclude=name + ".module_[1-9]*",
+            )
+        )
+        imported_excluded = imported(name)
+
+        everything, _ = timed(lambda: jdoc.document([jdoc.IncludeChildren(package, submodules=True)], output))
+        imported_everything = imported(name)
+
+        print("All modules:       {:.3f} s ({} modules imported)".format(everything, imported_everything))
+        print("Most excluded:     {:.3f} s ({} modules imported)".format(excluded, imported_excluded))
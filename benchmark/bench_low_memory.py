@@ -0,0 +1,76 @@
+"""
+Compares the peak memory use of documenting a package with 5000 modules normally and in low-memory mode
+
+Each mode is run in a separate process, which reports its peak resident set size.
+"""
+import importlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import jdoc
+import synthetic
+
+NAME = "bench_low_memory_pkg"
+MODULES = 5000
+
+
+def peak_rss_mb() -> float:
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run(mode: str, directory: str):
+    sys.path.insert(0, directory)
+    names = ["{}.module_{}".format(NAME, module) for module in range(MODULES)]
+    filename = os.path.join(directory, "{}.md".format(mode))
+    start = time.perf_counter()
+
+    if mode == "normal":
+        objects = [jdoc.TableOfContents()]
+        objects += [jdoc.IncludeChildren(importlib.import_module(name)) for name in names]
+        jdoc.document(objects, filename)
+    else:
+
+        def objects():
+            yield jdoc.TableOfContents()
+            for name in names:
+                yield jdoc.IncludeChildren(importlib.import_module(name))
+
+        jdoc.document(objects(), filename, low_memory=True, unload_modules=True)
+
+    print("{:.3f} {:.1f}".format(time.perf_counter() - start, peak_rss_mb()))
+
+
+def measure(mode: str, directory: str) -> tuple:
+    output = subprocess.check_output([sys.executable, __file__, mode, directory], universal_newlines=True)
+    elapsed, peak = output.split()
+    return float(elapsed), float(peak)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        run(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic.generate(
+            directory, NAME, modules=MODULES, functions=10, classes=3, methods=3, import_modules=False
+        )
+        normal_time, normal_peak = measure("normal", directory)
+        low_memory_time, low_memory_peak = measure("low_memory", directory)
+
+        with open(os.path.join(directory, "normal.md")) as normal, open(
+            os.path.join(directory, "low_memory.md")
+        ) as low_memory:
+            assert normal.read() == low_memory.read(), "The outputs differ"
+
+    print("Normal:     {:.1f} s, peak RSS {:.1f} MB".format(normal_time, normal_peak))
+    print("Low memory: {:.1f} s, peak RSS {:.1f} MB".format(low_memory_time, low_memory_peak))
+    assert low_memory_peak < normal_peak / 2, "Low-memory mode should use less than half the memory"
@@ -0,0 +1,43 @@
+"""
+Measures the cost of building a search index for a package with 10k documented symbols
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import jdoc
+import synthetic
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        # 100 modules * (40 functions + 10 classes * (1 + 5 methods)) = 10000 symbols
+        modules = synthetic.generate(
+            directory, "bench_search_index_pkg", modules=100, functions=40, classes=10, methods=5
+        )
+        objects = [jdoc.IncludeChildren(module) for module in modules]
+        readme = os.path.join(directory, "README.md")
+        index = os.path.join(directory, "api.idx.json")
+
+        without_index = timed(lambda: jdoc.document(objects, readme))
+        with_index = timed(lambda: jdoc.document(objects, readme, search_index=index))
+        size = os.path.getsize(index)
+
+        # Only the first module changes
+        modules[0].function_0.__doc__ = "Changed docstring."
+        incremental = timed(lambda: jdoc.document(objects, readme, search_index=index))
+
+        print("Build without index:   {:.3f} s".format(without_index))
+        print("Build with full index: {:.3f} s".format(with_index))
+        print("Incremental rebuild:   {:.3f} s".format(incremental))
+        print("Index size:            {:.1f} kB".format(size / 1024))
+        print("README size:           {:.1f} kB".format(os.path.getsize(readme) / 1024))
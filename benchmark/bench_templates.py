@@ -0,0 +1,63 @@
+"""
+Compares rendering with compiled templates into a shared buffer with the previous format-then-clean approach
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import jdoc
+import synthetic
+
+
+@jdoc._clean_up_docstring
+def format_then_clean(wrapper: jdoc.ObjectWrapper) -> str:
+    """The way `full_doc()` used to work: format a template, with the children formatted recursively, then clean up
+    the result at every level."""
+    if isinstance(wrapper, jdoc.ModuleWrapper):
+        signature = wrapper.obj.__name__
+    else:
+        signature = wrapper.oneliner()
+    children = ""
+    if wrapper.include_children:
+        children = "\n".join(format_then_clean(child) for child in wrapper.children())
+    return """{heading} `{signature}`
+
+{doc}
+
+{children}
+""".format(
+        heading="#" * wrapper.heading_level,
+        signature=signature,
+        doc=wrapper.text(),
+        children=children,
+    )
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        modules = synthetic.generate(
+            directory, "bench_templates_pkg", modules=100, functions=40, classes=10, methods=5
+        )
+        package = jdoc.PackageWrapper([jdoc.IncludeChildren(module) for module in modules])
+        children = package.children()
+
+        # Warm up the signature computations, which are the same in both cases
+        package.full_doc()
+
+        old, old_output = timed(
+            lambda: jdoc._clean_up_docstring(lambda: "\n".join(map(format_then_clean, children)))()
+        )
+        new, new_output = timed(package.full_doc)
+
+        print("Format then clean:  {:.3f} s".format(old))
+        print("Compiled templates: {:.3f} s".format(new))
+        print("Output size:        {:.1f} kB".format(len(new_output) / 1024))
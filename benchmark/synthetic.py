@@ -0,0 +1,86 @@
+"""
+Generates synthetic packages for benchmarking
+"""
+import importlib
+import os
+import sys
+
+MODULE_TEMPLATE = '''"""Synthetic module number {module}."""
+{functions}
+{classes}
+'''
+
+FUNCTION_TEMPLATE = '''
+
+def function_{i}(x: int, y: str = "default") -> str:
+    """Function number {i} of module {module}.
+
+    Converts `x` to a string and appends `y` to it.
+    """
+    return str(x) + y
+'''
+
+CLASS_TEMPLATE = '''
+
+class Class{i}(object):
+    """Class number {i} of module {module}."""
+
+    def __init__(self, value: float):
+        """Initializes the instance with `value`."""
+        self.value = value
+{methods}
+'''
+
+METHOD_TEMPLATE = '''
+    def method_{j}(self, factor: float = 1.0) -> float:
+        """Method number {j}, which scales the value by `factor`."""
+        return self.value * factor
+'''
+
+
+def generate(
+    directory: str,
+    name: str,
+    modules: int,
+    functions: int = 0,
+    classes: int = 0,
+    methods: int = 0,
+    import_modules: bool = True,
+) -> list:
+    """Writes a package called `name` into `directory` and returns a list of its imported modules.
+
+    The package has `modules` submodules, each with `functions` functions and `classes` classes. Each class has
+    `methods` methods in addition to `__init__`. If `import_modules` is False, only the package itself is imported
+    and the list contains just the package."""
+    package_dir = os.path.join(directory, name)
+    os.makedirs(package_dir, exist_ok=True)
+    with open(os.path.join(package_dir, "__init__.py"), "w") as file:
+        file.write('"""Synthetic package."""\n')
+
+    for module in range(modules):
+        source = MODULE_TEMPLATE.format(
+            module=module,
+            functions="".join(
+                FUNCTION_TEMPLATE.format(i=i, module=module) for i in range(functions)
+            ),
+            classes="".join(
+                CLASS_TEMPLATE.format(
+                    i=i,
+                    module=module,
+                    methods="".join(METHOD_TEMPLATE.format(j=j) for j in range(methods)),
+                )
+                for i in range(classes)
+            ),
+        )
+        with open(os.path.join(package_dir, "module_{}.py".format(module)), "w") as file:
+            file.write(source)
+
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    importlib.invalidate_caches()
+    if not import_modules:
+        return [importlib.import_module(name)]
+    return [
+        importlib.import_module("{}.module_{}".format(name, module))
+        for module in range(modules)
+    ]
@@ -21,11 +21,16 @@ if __name__ == "__main__":
             TableOfContents("Table of Contents"),
             HorizontalLine(),
             my_package.document,
+            my_package.check,
+            my_package.api_hashes,
+            IncludeChildren(my_package.DocSession),
+            IncludeChildren(my_package.Profiler),
             HorizontalLine(),
             IncludeChildren(my_package.Plugin),
             my_package.HorizontalLine,
             my_package.TableOfContents,
             my_package.IncludeChildren,
+            my_package.NameFilter,
             my_package.Indent,
             my_package.Dedent,
             HorizontalLine(),
@@ -1,11 +1,28 @@
 """
 Tools for collecting documentation
 """
+import ast
+import fnmatch
 import functools
+import hashlib
+import importlib
 import inspect
+import json
+import os
+import pkgutil
 import pydoc
+import re
+import shutil
+import string
+import sys
+import tempfile
+import threading
+import time
+import tokenize
+import tracemalloc
+from collections import OrderedDict, namedtuple
 from textwrap import dedent
-from typing import Iterable, List, Union
+from typing import Dict, Iterable, List, Union
 import types
 
 
@@ -39,16 +56,527 @@ def _clean_up_docstring(func):
     return wrapper
 
 
+def _anchor(text: str) -> str:
+    """Returns the anchor that GitHub generates for a heading with the given text."""
+    anchor = re.sub(r"[^\w\- ]", "", text.strip().lower())
+    return anchor.replace(" ", "-")
+
+
+class _AnchorCounter(object):
+    """Generates collision-free anchors for a sequence of headings, in the same way as GitHub."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def __call__(self, heading: str) -> str:
+        anchor = _anchor(heading)
+        count = self.counts.get(anchor, 0)
+        self.counts[anchor] = count + 1
+        if count:
+            anchor = "{}-{}".format(anchor, count)
+        return anchor
+
+
+def _cached_render(func):
+    """Decorator for `render()` methods, which lets the registry or the session of the wrapper (if any) reuse earlier
+    renderings of the same object."""
+
+    @functools.wraps(func)
+    def wrapper(self, buffer):
+        def render():
+            if self.registry is not None:
+                self.registry.render(self, func, buffer)
+            elif self.session is not None:
+                self.session.render(self, func, buffer)
+            else:
+                func(self, buffer)
+
+        self._profiled("render", render)
+
+    return wrapper
+
+
+def _cached_children(func):
+    """Decorator for `children()` methods, which stores the children on the wrapper the first time they are needed."""
+
+    @functools.wraps(func)
+    def wrapper(self):
+        if self._children is None:
+            self._children = self._profiled("children", func, self)
+        return self._children
+
+    return wrapper
+
+
+# Passed on to everything that keeps track of the rendered headings, each time an object is rendered
+_HeadingRecord = namedtuple("_HeadingRecord", "obj wrapper_type heading_level signature doc")
+
+# The attributes of a wrapper that are the same for every wrapper in one build (see `ObjectWrapper._share_settings()`)
+_BUILD_SETTINGS = (
+    "search_index",
+    "api_hashes",
+    "docstring_parser",
+    "registry",
+    "outline",
+    "templates",
+    "source_links",
+    "session",
+    "profiler",
+)
+
+
+_BUILTIN_ROUTINE_TYPES = (
+    types.BuiltinFunctionType,
+    type(str.join),
+    type(str.__add__),
+    type(dict.__dict__["fromkeys"]),
+)
+
+
+def _is_builtin_routine(obj: object) -> bool:
+    """Returns whether `obj` is a function or method implemented in C, e.g. in an extension module."""
+    if isinstance(obj, _BUILTIN_ROUTINE_TYPES):
+        return True
+    # Cython functions, and methods of pybind11 classes (which wrap a builtin function in an `instancemethod`)
+    return type(obj).__name__ in ("cython_function_or_method", "instancemethod") and callable(obj)
+
+
+def _split_parameters(parameters: str) -> List[str]:
+    """Splits a comma-separated parameter list, ignoring commas within brackets and strings."""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, char in enumerate(parameters):
+        if quote:
+            if char == quote and parameters[i - 1] != "\\":
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(parameters[start:i].strip())
+            start = i + 1
+    parts.append(parameters[start:].strip())
+    return [part for part in parts if part]
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_text_signature(text_signature: str, skip_first: bool = False) -> str:
+    """Turns a signature like `($module, x, /)` from `__text_signature__` or the first line of a docstring into the
+    format used by `inspect.Signature`, without creating a `Signature`. If `skip_first` is True, the first parameter
+    (e.g. `self`) is left out."""
+    depth = 0
+    end = len(text_signature)
+    for i, char in enumerate(text_signature):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                end = i
+                break
+    parameters = _split_parameters(text_signature[text_signature.find("(") + 1 : end])
+    rest = text_signature[end + 1 :].rstrip()
+
+    if parameters and parameters[0].startswith("$"):
+        if parameters[0] == "$module":
+            parameters.pop(0)
+        else:
+            parameters[0] = parameters[0][1:]
+    if skip_first and parameters and parameters[0] not in ("/", "*") and not parameters[0].startswith("*"):
+        parameters.pop(0)
+    if parameters and parameters[0] == "/":
+        parameters.pop(0)
+
+    return "(" + ", ".join(parameters) + ")" + rest
+
+
+def _doc_signature(obj: object) -> Union[str, None]:
+    """Returns the signature in the first line of the docstring of `obj`, if there is one. For example, this is
+    `(x, [base=math.e])` for `log(x, [base=math.e])` and `()` for `D.keys() -> a set-like object`."""
+    doc = getattr(obj, "__doc__", None)
+    name = getattr(obj, "__name__", None)
+    if not doc or not name:
+        return None
+    first_line = doc.lstrip().split("\n", 1)[0].strip()
+    prefix = first_line.split("(", 1)[0]
+    if (prefix == name or prefix.endswith("." + name)) and ")" in first_line:
+        return first_line[len(prefix) :]
+    return None
+
+
+def _builtin_signature(obj: object, skip_first: bool = False) -> str:
+    """Returns the signature of a builtin function or method (without its name), from `__text_signature__` or the
+    first line of the docstring. Falls back to `(...)` if neither is available."""
+    text_signature = getattr(obj, "__text_signature__", None) or _doc_signature(obj)
+    if not text_signature:
+        return "(...)"
+    return _parse_text_signature(text_signature, skip_first)
+
+
+def _module_name(obj: object) -> str:
+    """Returns the name of the module that `obj` is, or belongs to."""
+    if inspect.ismodule(obj):
+        return obj.__name__
+    return getattr(obj, "__module__", None) or ""
+
+
+def _qualified_name(obj: object) -> str:
+    """Returns the fully qualified name of a module, class or function, e.g. `package.module.Class.method`."""
+    if inspect.ismodule(obj):
+        return obj.__name__
+    name = getattr(obj, "__qualname__", None) or getattr(obj, "__name__", "")
+    module = getattr(obj, "__module__", None)
+    if module:
+        return module + "." + name
+    return name
+
+
+class SourceLinks(object):
+    """Finds links to the source code of documented objects, for use in the headings.
+
+    `url` is a format string with the fields `{path}` (the path of the source file relative to `root`, which defaults
+    to the current working directory) and `{line}`, e.g.
+    `"https://github.com/user/repo/blob/master/{path}#L{line}"`.
+
+    Each source file is parsed once to build an index from the qualified name of each class and function defined in
+    it to its line number. The index is shared by all objects from that file, and stored in the `"sources"` cache of
+    the session if there is one. Objects that are not defined in a Python source file get no link.
+    """
+
+    def __init__(self, url: str, root: str = None):
+        self.url = url
+        self.root = root if root is not None else os.getcwd()
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def index(filename: str) -> Dict[str, int]:
+        """Parses the source file `filename`, and returns a dict from the qualified name of each class and function
+        defined there to the line number of its definition."""
+        with tokenize.open(filename) as file:
+            tree = ast.parse(file.read(), filename)
+
+        index = {}
+
+        def visit(node, prefix):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                    qualname = prefix + child.name
+                    index[qualname] = child.lineno
+                    if isinstance(child, ast.ClassDef):
+                        visit(child, qualname + ".")
+                    else:
+                        visit(child, qualname + ".<locals>.")
+                else:
+                    visit(child, prefix)
+
+        visit(tree, "")
+        return index
+
+    def _cached_index(self, filename: str) -> Dict[str, int]:
+        with self._lock:
+            index = self._indexes.get(filename)
+        if index is None:
+            index = self.index(filename)
+            with self._lock:
+                self._indexes[filename] = index
+        return index
+
+    def link(self, obj: object, session: "DocSession" = None) -> Union[str, None]:
+        """Returns the URL of the source code of `obj`, or None if it was not found."""
+        obj = inspect.unwrap(obj) if callable(obj) else obj
+        module = sys.modules.get(_module_name(obj))
+        filename = getattr(module, "__file__", None)
+        if not filename or not filename.endswith(".py"):
+            return None
+
+        if inspect.ismodule(obj):
+            line = 1
+        else:
+            if session is not None:
+                index = session.get("sources", module, filename, lambda: self.index(filename))
+            else:
+                index = self._cached_index(filename)
+            line = index.get(getattr(obj, "__qualname__", None))
+            if line is None:
+                return None
+
+        path = os.path.relpath(filename, self.root).replace(os.sep, "/")
+        return self.url.format(path=path, line=line)
+
+
+class NameFilter(object):
+    """Include and exclude patterns for the qualified names of documented objects, e.g. `package.module.Class.method`.
+
+    Each of `include` and `exclude` may be a pattern or a list of patterns. A pattern is either a glob as a string
+    (where `*` also matches dots, so `"package.*._internal*"` matches anything below a module named `_internal...`) or
+    a compiled regular expression, which must match from the start of the name. The patterns are compiled into a single
+    regular expression for each of `include` and `exclude`.
+
+    * Children whose qualified name matches an `exclude` pattern are skipped along with their own children, before
+      they are looked up, imported or introspected.
+    * Private children (whose name starts with an underscore) are included if their qualified name matches an
+      `include` pattern.
+    """
+
+    def __init__(self, include: Union[str, list] = None, exclude: Union[str, list] = None):
+        self.include = self._sources(include)
+        self.exclude = self._sources(exclude)
+        self._include = self._compile(self.include)
+        self._exclude = self._compile(self.exclude)
+
+    def __eq__(self, other: "NameFilter") -> bool:
+        return isinstance(other, NameFilter) and (self.include, self.exclude) == (other.include, other.exclude)
+
+    def __hash__(self):
+        return hash((self.include, self.exclude))
+
+    @staticmethod
+    def _sources(patterns: Union[str, list, None]) -> tuple:
+        if patterns is None:
+            return ()
+        if isinstance(patterns, str) or hasattr(patterns, "pattern"):
+            patterns = [patterns]
+        return tuple(
+            NameFilter._regex_source(pattern) if hasattr(pattern, "pattern") else fnmatch.translate(pattern)
+            for pattern in patterns
+        )
+
+    # The flags that may be set for a part of a regular expression, with their inline letters (Python 3.6 does not
+    # allow `a` there)
+    _inline_flags = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+    if sys.version_info >= (3, 7):
+        _inline_flags += ((re.ASCII, "a"),)
+
+    @staticmethod
+    def _regex_source(pattern) -> str:
+        """Returns the source of the compiled regular expression `pattern`, with its flags as inline flags so that
+        they still apply when it is combined with other patterns."""
+        letters = "".join(letter for flag, letter in NameFilter._inline_flags if pattern.flags & flag)
+        return "(?{}:{})".format(letters, pattern.pattern) if letters else pattern.pattern
+
+    @staticmethod
+    def _compile(sources: tuple):
+        if not sources:
+            return None
+        return re.compile("|".join("(?:{})".format(source) for source in sources))
+
+    def excluded(self, name: str) -> bool:
+        """Returns True if `name` matches one of the exclude patterns."""
+        return self._exclude is not None and self._exclude.match(name) is not None
+
+    def included(self, name: str) -> bool:
+        """Returns True if `name` matches one of the include patterns."""
+        return self._include is not None and self._include.match(name) is not None
+
+    def combine(self, other: Union["NameFilter", None]) -> "NameFilter":
+        """Returns a filter with the patterns of both `self` and `other`."""
+        if other is None:
+            return self
+        combined = NameFilter()
+        combined.include = self.include + other.include
+        combined.exclude = self.exclude + other.exclude
+        combined._include = self._compile(combined.include)
+        combined._exclude = self._compile(combined.exclude)
+        return combined
+
+
+class OutputBuffer(object):
+    """Collects the output of `render()` methods.
+
+    Runs of more than two newlines are collapsed into two as the text is written, which is equivalent to cleaning up
+    the complete output afterwards."""
+
+    newlines_pattern = re.compile(r"\n{3,}")
+
+    def __init__(self):
+        self.parts = []
+        self.trailing_newlines = 0
+        self.deferred = False
+
+    def write(self, text: str):
+        """Appends `text` to the output."""
+        if not text:
+            return
+        if "\n\n\n" in text:
+            text = self.newlines_pattern.sub("\n\n", text)
+        if self.trailing_newlines and text[0] == "\n":
+            leading_newlines = len(text) - len(text.lstrip("\n"))
+            excess = leading_newlines + self.trailing_newlines - 2
+            if excess > 0:
+                text = text[excess:]
+                if not text:
+                    return
+
+        stripped = text.rstrip("\n")
+        if stripped:
+            self.trailing_newlines = len(text) - len(stripped)
+        else:
+            self.trailing_newlines += len(text)
+        self.parts.append(text)
+
+    def write_deferred(self, text_function):
+        """Appends the output of `text_function()`, which is only called when `getvalue()` is called. This is used for
+        text that depends on what comes later in the output, like a table of contents. The text should neither start
+        nor end with a newline."""
+        self.parts.append(text_function)
+        self.trailing_newlines = 0
+        self.deferred = True
+
+    def drain(self) -> list:
+        """Removes and returns the parts that have been written so far, each of which is either a string or a function
+        passed to `write_deferred()`. Newlines are still collapsed across the parts that are written later."""
+        parts = self.parts
+        self.parts = []
+        return parts
+
+    def getvalue(self) -> str:
+        """Returns everything that has been written to the buffer."""
+        if self.deferred:
+            return "".join(part if isinstance(part, str) else part() for part in self.parts)
+        return "".join(self.parts)
+
+
+class Template(object):
+    """A template for the documentation of one kind of object, compiled into a list of functions that write the
+    parts of the output to an `OutputBuffer`.
+
+    The template may contain the following fields:
+
+    * `{heading}`: the `#` characters for the heading
+    * `{signature}`: the output of `oneliner()`
+    * `{title}`: the output of `oneliner()` as inline code, linked to the source code if source links are enabled
+    * `{source}`: the URL of the source code of the object if source links are enabled and it was found, otherwise
+      empty
+    * `{name}`: the qualified name of the object
+    * `{doc}`: the docstring of the object, formatted by the docstring parser if one is used
+    * `{children}`: the documentation for the children of the object, if they should be included
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.parts = []
+        for literal, field, format_spec, conversion in string.Formatter().parse(source):
+            if literal:
+                self.parts.append(self._literal(literal))
+            if field is None:
+                continue
+            if format_spec or conversion:
+                raise ValueError("Format specs are not supported: {!r}".format(source))
+            try:
+                self.parts.append(getattr(self, "_field_" + field))
+            except AttributeError:
+                raise ValueError("Unknown field {!r} in template {!r}".format(field, source))
+
+    @staticmethod
+    def _literal(literal):
+        def write_literal(buffer, wrapper, signature, doc):
+            buffer.write(literal)
+
+        return write_literal
+
+    @staticmethod
+    def _field_heading(buffer, wrapper, signature, doc):
+        buffer.write("#" * wrapper.heading_level)
+
+    @staticmethod
+    def _field_signature(buffer, wrapper, signature, doc):
+        buffer.write(signature)
+
+    @staticmethod
+    def _field_title(buffer, wrapper, signature, doc):
+        link = wrapper._source_link()
+        if link is None:
+            buffer.write("`{}`".format(signature))
+        else:
+            buffer.write("[`{}`]({})".format(signature, link))
+
+    @staticmethod
+    def _field_source(buffer, wrapper, signature, doc):
+        buffer.write(wrapper._source_link() or "")
+
+    @staticmethod
+    def _field_name(buffer, wrapper, signature, doc):
+        buffer.write(_qualified_name(wrapper.obj))
+
+    @staticmethod
+    def _field_doc(buffer, wrapper, signature, doc):
+        buffer.write(wrapper._format_text(doc))
+
+    @staticmethod
+    def _field_children(buffer, wrapper, signature, doc):
+        if wrapper.include_children:
+            for i, child in enumerate(wrapper.children()):
+                if i:
+                    buffer.write("\n")
+                child.render(buffer)
+
+    def render(self, buffer: OutputBuffer, wrapper: "ObjectWrapper", signature: str, doc: str):
+        """Writes the documentation for `wrapper` to `buffer`."""
+        for part in self.parts:
+            part(buffer, wrapper, signature, doc)
+
+
+class Templates(object):
+    """The templates used for each kind of object, i.e. `"function"`, `"method"`, `"class"` and `"module"`.
+
+    Pass a dict with templates for some of the kinds to `document()` to override the defaults. See `Template` for
+    the fields that can be used. The templates are compiled once, when the `Templates` object is created.
+    """
+
+    defaults = {
+        "function": "{heading} {title}\n\n{doc}\n",
+        "method": "{heading} {title}\n\n{doc}\n",
+        "class": "{heading} {title}\n\n{doc}\n\n{children}\n\n",
+        "module": "{heading} {title}\n\n{doc}\n\n{children}\n",
+    }
+
+    def __init__(self, overrides: Dict[str, str] = None):
+        sources = dict(self.defaults)
+        for kind, source in (overrides or {}).items():
+            if kind not in sources:
+                raise ValueError("Unknown kind of object: {!r}".format(kind))
+            sources[kind] = source
+        self.templates = {kind: Template(source) for kind, source in sources.items()}
+
+    def __getitem__(self, kind: str) -> Template:
+        return self.templates[kind]
+
+
+_default_templates = Templates()
+
+
 class ObjectWrapper(object):
     """Base class for objects that should be documented."""
 
+    template_kind = None
+
     def __init__(self, obj: object):
         """Initializes the DocumentedObject with the object that it wraps."""
         self.obj = obj
         self.include_children = False
+        self.inherited = False
+        self.inherited_from = None
+        self.submodules = False
         self.includes = set()
         self.excludes = set()
+        self.filters = None
         self.heading_level = 0
+        self.search_index = None
+        self.api_hashes = None
+        self.docstring_parser = None
+        self.registry = None
+        self.outline = None
+        self.templates = None
+        self.source_links = None
+        self.session = None
+        self.profiler = None
+        self._children = None
 
     def __repr__(self):
         return "<{} {}>".format(type(self).__name__, self.oneliner())
@@ -83,17 +611,127 @@ class ObjectWrapper(object):
         """Returns the text corresponding to the documentation of the object and all its children."""
         return ""
 
+    def render(self, buffer: OutputBuffer):
+        """Writes the documentation of the object and all its children to `buffer`.
+
+        If not overridden, this writes the output of `full_doc()`."""
+        buffer.write(self.full_doc())
+
+    def _render_template(self, buffer: OutputBuffer, signature: str):
+        """Renders the object using the template for `self.template_kind`."""
+        if self.inherited_from is not None and self.inherited == "reference":
+            doc = "Inherited from `{}`.".format(_qualified_name(self.inherited_from))
+        else:
+            doc = self.text()
+        self._record(signature, doc)
+        templates = self.templates if self.templates is not None else _default_templates
+        templates[self.template_kind].render(buffer, self, signature, doc)
+
+    def _full_doc_from_render(self) -> str:
+        buffer = OutputBuffer()
+        self.render(buffer)
+        return buffer.getvalue()
+
     def oneliner(self) -> str:
         """Returns a one-line representation of the object. For functions and method, this is the function signature.
 
         For classes, this is the signature of the `__init__` function. For modules, this is the import statement."""
         return ""
 
-    @functools.lru_cache()
+    @_cached_children
     def children(self) -> List["ObjectWrapper"]:
         """Returns all children of `self`."""
         return []
 
+    def _child_objects(self) -> Iterable[object]:
+        """Returns the objects that the children of `self` wrap."""
+        return []
+
+    def _cached_child_objects(self) -> List[object]:
+        key = (frozenset(self.includes), frozenset(self.excludes), self.filters, self.submodules)
+        return self._cached(
+            "children", key, lambda: list(self._child_objects()), lambda objs: [_module_name(obj) for obj in objs]
+        )
+
+    def _share_settings(self, child: "ObjectWrapper"):
+        """Passes on the settings of the build to `child`, and adds the filters of `self` to those of `child`."""
+        for name in _BUILD_SETTINGS:
+            setattr(child, name, getattr(self, name))
+        if self.filters is not None:
+            child.filters = self.filters.combine(child.filters)
+
+    def _adopt(self, child: "ObjectWrapper"):
+        """Passes on the settings that apply to the whole subtree below `self` to one of its children."""
+        self._share_settings(child)
+        child.include_children = self.include_children
+        child.inherited = self.inherited
+        child.submodules = self.submodules
+
+    def _format_text(self, text: str) -> str:
+        """Formats the output of `text()` for use in `full_doc()`, using the docstring parser if one is set."""
+        if self.docstring_parser is not None:
+            text = self.docstring_parser.render(text)
+        return text
+
+    def _source_link(self) -> Union[str, None]:
+        """Returns the URL of the source code of the object, if source links are enabled and the source was found."""
+        if self.source_links is None:
+            return None
+        return self.source_links.link(self.obj, self.session)
+
+    def _record(self, signature: str, doc: str):
+        """Called with the heading text and docstring of the object when it is rendered."""
+        self._emit(_HeadingRecord(self.obj, type(self), self.heading_level, signature, doc))
+
+    def _emit(self, record: _HeadingRecord):
+        """Passes a heading record on to everything that keeps track of the rendered headings. Records of cached
+        renderings are passed on again when the cached rendering is reused."""
+        anchor = None
+        if self.outline is not None:
+            anchor = self.outline.add(record)
+        if self.session is not None:
+            self.session.record(record)
+        if self.registry is not None:
+            self.registry.record(record, anchor)
+        if self.search_index is not None:
+            self.search_index.add(record.obj, record.signature, record.doc, anchor)
+        if self.api_hashes is not None:
+            self.api_hashes.add(record.obj, record.signature, record.doc)
+
+    def _filtered_members(self, names: Iterable[str], lookup) -> Iterable[tuple]:
+        """Yields `(lookup(name), forced)` for each of the given member names, skipping the members that are excluded
+        by `self.filters` before they are looked up. `forced` is True if the qualified name of the member matches one
+        of the include patterns."""
+        prefix = _qualified_name(self.obj) + "."
+        for name in names:
+            forced = False
+            if self.filters is not None:
+                if self.filters.excluded(prefix + name):
+                    continue
+                forced = self.filters.included(prefix + name)
+            try:
+                obj = lookup(name)
+            except (AttributeError, KeyError):
+                continue
+            yield obj, forced
+
+    def _cached(self, cache: str, key: object, compute, dependencies=None):
+        """Returns `compute()`, cached in the given cache of the session (if any) for this object and `key`. See
+        `DocSession.get()` for `dependencies`."""
+        if self.session is None:
+            return compute()
+        return self.session.get(cache, self.obj, key, compute, dependencies)
+
+    def _cached_signature(self) -> str:
+        """Returns `self._signature()`, cached in the `"signatures"` cache of the session (if any)."""
+        return self._profiled("oneliner", self._cached, "signatures", None, self._signature)
+
+    def _profiled(self, operation: str, func, *args):
+        """Returns `func(*args)`, timed as `operation` on this object by the profiler (if any)."""
+        if self.profiler is None:
+            return func(*args)
+        return self.profiler.measure(operation, self, func, *args)
+
     @classmethod
     def from_object(cls, obj: object) -> "ObjectWrapper":
         """Factory function which detects the type of `obj` and returns an appropriate subclass of `DocumentedObject`.
@@ -104,6 +742,11 @@ class ObjectWrapper(object):
             wrapper = ClassWrapper(obj)
         elif inspect.isfunction(obj):
             wrapper = FunctionWrapper(obj)
+        elif _is_builtin_routine(getattr(obj, "__func__", obj)):
+            wrapper = BuiltinFunctionWrapper(getattr(obj, "__func__", obj))
+        elif isinstance(obj, (classmethod, staticmethod)) and not inspect.isfunction(obj.__func__):
+            # Wraps some other callable, e.g. `__class_getitem__ = classmethod(types.GenericAlias)`
+            wrapper = BuiltinFunctionWrapper(obj.__func__)
         elif isinstance(obj, classmethod):
             wrapper = ClassMethodWrapper(obj.__func__)
         elif isinstance(obj, staticmethod):
@@ -117,36 +760,41 @@ class ObjectWrapper(object):
 class FunctionWrapper(ObjectWrapper):
     """Represents a function."""
 
+    template_kind = "function"
+
     def __init__(self, obj):
         super().__init__(obj)
         self.heading_level = 2
 
     def oneliner(self):
-        signature = str(inspect.signature(self.obj))
-        return self.obj.__name__ + signature
+        return self._cached_signature()
 
-    @_clean_up_docstring
-    def full_doc(self):
-        signature = self.oneliner()
-        doc = self.text()
-        heading = "#" * self.heading_level
+    def _signature(self) -> str:
+        try:
+            signature = str(inspect.signature(self.obj))
+        except (TypeError, ValueError):
+            signature = _builtin_signature(self.obj)
+        return self.obj.__name__ + signature
 
-        return """{heading} `{signature}`
+    @_cached_render
+    def render(self, buffer):
+        self._render_template(buffer, self.oneliner())
 
-{doc}
-""".format(
-            signature=signature, doc=doc, heading=heading
-        )
+    full_doc = ObjectWrapper._full_doc_from_render
 
 
 class MethodWrapper(ObjectWrapper):
     """Represents a method."""
 
+    template_kind = "method"
+
     def __init__(self, obj):
         super().__init__(obj)
         self.heading_level = 2
 
     oneliner = FunctionWrapper.oneliner
+    _signature = FunctionWrapper._signature
+    render = FunctionWrapper.render
     full_doc = FunctionWrapper.full_doc
 
 
@@ -158,48 +806,82 @@ class StaticMethodWrapper(MethodWrapper):
     """Represents a static method"""
 
 
+class BuiltinFunctionWrapper(ObjectWrapper):
+    """Represents a function implemented in C, e.g. in an extension module.
+
+    The signature is parsed directly from `__text_signature__` or from the first line of the docstring, since
+    `inspect.signature()` is slow or fails for such functions."""
+
+    template_kind = "function"
+
+    def __init__(self, obj):
+        super().__init__(obj)
+        self.heading_level = 2
+
+    def oneliner(self):
+        return self._cached_signature()
+
+    def _signature(self) -> str:
+        return self.obj.__name__ + _builtin_signature(self.obj)
+
+    @_clean_up_docstring
+    def text(self) -> str:
+        doc = self.obj.__doc__ or ""
+        if _doc_signature(self.obj) is not None:
+            # The signature is already in the heading
+            doc = doc.lstrip().partition("\n")[2].lstrip("\n")
+        return doc
+
+    render = FunctionWrapper.render
+    full_doc = FunctionWrapper.full_doc
+
+
+class BuiltinMethodWrapper(BuiltinFunctionWrapper):
+    """Represents a method implemented in C, e.g. in an extension type."""
+
+    template_kind = "method"
+
+
 class ClassWrapper(ObjectWrapper):
     """Represents a class."""
 
+    template_kind = "class"
+
     def __init__(self, obj):
         super().__init__(obj)
         self.heading_level = 2
 
     def oneliner(self) -> str:
-        signature_with_self = inspect.signature(self.obj.__init__)
+        return self._cached_signature()
+
+    def _signature(self) -> str:
+        init = self.obj.__init__
+        if not inspect.isfunction(init):
+            # Extension types, and classes that do not define `__init__`
+            text_signature = getattr(self.obj, "__text_signature__", None)
+            if text_signature:
+                return self.obj.__name__ + _parse_text_signature(text_signature)
+            return self.obj.__name__ + _builtin_signature(init, skip_first=True)
+
+        signature_with_self = inspect.signature(init)
         values = list(signature_with_self.parameters.values())[1:]
         signature = inspect.Signature(values)
         return self.obj.__name__ + str(signature)
 
-    @_clean_up_docstring
-    def full_doc(self) -> str:
-        heading = "#" * self.heading_level
-        signature = self.oneliner()
-        doc = self.text()
-
-        if self.include_children:
-            method_docs = "\n".join(child.full_doc() for child in self.children())
-        else:
-            method_docs = ""
-
-        return """{heading} `{signature}`
+    @_cached_render
+    def render(self, buffer):
+        self._render_template(buffer, self.oneliner())
 
-{doc}
+    full_doc = ObjectWrapper._full_doc_from_render
 
-{method_docs}
-
-""".format(
-            signature=signature, doc=doc, heading=heading, method_docs=method_docs
-        )
-
-    def _is_child(self, obj) -> bool:
-        is_child = inspect.isfunction(obj)
+    def _is_child(self, obj, forced: bool = False) -> bool:
+        is_child = inspect.isfunction(obj) or _is_builtin_routine(obj)
         try:
             name = obj.__name__
         except AttributeError:
             is_child = False
         else:
-            is_child &= not name.startswith("_")
+            is_child &= forced or not name.startswith("_")
             is_child |= name == "__init__"
             is_child |= name in self.includes
             is_child &= name not in self.excludes
@@ -209,18 +891,49 @@ class ClassWrapper(ObjectWrapper):
 
         return is_child
 
-    @functools.lru_cache()
+    def _child_objects(self) -> Iterable[object]:
+        members = self._filtered_members(self.obj.__dict__, self.obj.__dict__.__getitem__)
+        return (obj for obj, forced in members if self._is_child(obj, forced))
+
+    def _inherited_child_objects(self) -> Iterable[tuple]:
+        """Yields `(base, obj)` for the members that the class inherits from each of its base classes, following the
+        method resolution order. `__init__` and members of builtin classes such as `object` are not included."""
+        seen = set(self.obj.__dict__)
+        seen.add("__init__")
+        for base in self.obj.__mro__[1:]:
+            if base.__module__ == "builtins":
+                continue
+            names = [name for name in base.__dict__ if name not in seen]
+            seen.update(names)
+            for obj, forced in self._filtered_members(names, base.__dict__.__getitem__):
+                if self._is_child(obj, forced):
+                    yield base, obj
+
+    def _cached_inherited_child_objects(self) -> List[tuple]:
+        key = ("inherited", frozenset(self.includes), frozenset(self.excludes), self.filters)
+        return self._cached(
+            "children",
+            key,
+            lambda: list(self._inherited_child_objects()),
+            lambda members: [base.__module__ for base in self.obj.__mro__[1:]],
+        )
+
+    @_cached_children
     def children(self) -> List[MethodWrapper]:
-        children = [
-            ObjectWrapper.from_object(obj)
-            for obj in self.obj.__dict__.values()
-            if self._is_child(obj)
-        ]
+        members = [(None, obj) for obj in self._cached_child_objects()]
+        if self.inherited:
+            members += self._cached_inherited_child_objects()
 
-        for i, child in enumerate(children):
+        children = []
+        for base, obj in members:
+            child = ObjectWrapper.from_object(obj)
             if type(child) is FunctionWrapper:
-                children[i] = MethodWrapper(child.obj)
-            child.include_children = self.include_children
+                child = MethodWrapper(child.obj)
+            elif type(child) is BuiltinFunctionWrapper:
+                child = BuiltinMethodWrapper(child.obj)
+            self._adopt(child)
+            child.inherited_from = base
+            children.append(child)
 
         return children
 
@@ -228,17 +941,18 @@ class ClassWrapper(ObjectWrapper):
 class ModuleWrapper(ObjectWrapper):
     """Represents a module."""
 
+    template_kind = "module"
+
     def __init__(self, obj):
         super().__init__(obj)
         self.heading_level = 1
 
-    def _is_child(self, obj: object) -> bool:
-        is_child = inspect.isclass(obj) | inspect.isfunction(obj)
+    def _is_child(self, obj: object, forced: bool = False) -> bool:
+        is_child = inspect.isclass(obj) or inspect.isfunction(obj) or _is_builtin_routine(obj)
         is_child &= inspect.getmodule(obj) is self.obj
 
         try:
-            is_child &= not obj.__name__.startswith("_")
-            is_child &= pydoc.visiblename(obj.__name__)
+            is_child &= forced or not obj.__name__.startswith("_") and pydoc.visiblename(obj.__name__)
             is_child |= obj.__name__ in self.includes
             is_child &= obj.__name__ not in self.excludes
         except AttributeError:
@@ -246,40 +960,62 @@ class ModuleWrapper(ObjectWrapper):
 
         return is_child
 
-    @functools.lru_cache()
+    def _child_objects(self) -> Iterable[object]:
+        members = self._filtered_members(sorted(dir(self.obj)), functools.partial(getattr, self.obj))
+        yield from (obj for obj, forced in members if self._is_child(obj, forced))
+        if self.submodules:
+            yield from self._submodules()
+
+    def _submodules(self) -> Iterable[types.ModuleType]:
+        """Imports and yields the public submodules of a package, skipping those that are excluded by
+        `self.filters` without importing them."""
+        for info in pkgutil.iter_modules(getattr(self.obj, "__path__", []), self.obj.__name__ + "."):
+            name = info[1]
+            forced = False
+            if self.filters is not None:
+                if self.filters.excluded(name):
+                    continue
+                forced = self.filters.included(name)
+            if forced or not name.rpartition(".")[2].startswith("_"):
+                yield importlib.import_module(name)
+
+    @_cached_children
     def children(self) -> List["ObjectWrapper"]:
-        children = [
-            ObjectWrapper.from_object(obj)
-            for name, obj in inspect.getmembers(self.obj)
-            if self._is_child(obj)
-        ]
+        children = [ObjectWrapper.from_object(obj) for obj in self._cached_child_objects()]
 
         for child in children:
-            child.include_children = self.include_children
+            self._adopt(child)
 
         return children
 
     def oneliner(self) -> str:
         return self.obj.__name__
 
-    @_clean_up_docstring
-    def full_doc(self) -> str:
-        name = self.obj.__name__
-        doc = self.text()
-        heading = "#" * self.heading_level
+    @_cached_render
+    def render(self, buffer):
+        self._render_template(buffer, self.obj.__name__)
 
-        if self.include_children:
-            child_docs = "\n".join(child.full_doc() for child in self.children())
-        else:
-            child_docs = ""
-        return """{heading} `{name}`
+    full_doc = ObjectWrapper._full_doc_from_render
 
-{doc}
 
-{child_docs}
-""".format(
-            name=name, doc=doc, heading=heading, child_docs=child_docs
-        )
+_heading_pattern = re.compile(r"^(#{1,6})\s+(.*?)\s*$")
+_heading_link_pattern = re.compile(r"^\[(.*)\]\([^()]*\)$")
+
+
+def _markdown_headings(lines: List[str]) -> Iterable[tuple]:
+    """Yields `(line_number, level, text)` for each heading in `lines` that is not part of a code block. Headings
+    that are links (to the source code) are returned as the text of the link."""
+    in_code = False
+    for i, line in enumerate(lines):
+        if line.startswith("```"):
+            in_code = not in_code
+            continue
+        if not in_code and line.startswith("#"):
+            match = _heading_pattern.match(line)
+            if match:
+                text = match.group(2)
+                link = _heading_link_pattern.match(text)
+                yield i, len(match.group(1)), link.group(1) if link else text
 
 
 class MarkdownWrapper(ObjectWrapper):
@@ -292,13 +1028,23 @@ class MarkdownWrapper(ObjectWrapper):
 
     def text(self) -> str:
         if self._text is None:
-            with open(self.filename) as file:
-                self._text = file.read()
+            if self.session is not None:
+                self._text = self.session.markdown(self.filename)
+            else:
+                with open(self.filename) as file:
+                    self._text = file.read()
         return self._text
 
     def full_doc(self) -> str:
         return self.text()
 
+    def render(self, buffer: OutputBuffer):
+        text = self.text()
+        if self.outline is not None:
+            for _, level, heading in _markdown_headings(text.split("\n")):
+                self.outline.add_heading(heading, level)
+        buffer.write(text)
+
 
 class PackageWrapper(ObjectWrapper):
     """Represents a documented package."""
@@ -308,21 +1054,36 @@ class PackageWrapper(ObjectWrapper):
         super().__init__(None)
         self.objects = objects
 
-    @functools.lru_cache()
+    def _wrap(self, obj: object) -> Union[ObjectWrapper, None]:
+        """Returns the wrapper for one of `self.objects` with the settings of the package, or None if it is excluded."""
+        if self.filters is not None:
+            target = obj.obj if isinstance(obj, IncludeChildren) else obj
+            if not isinstance(target, (Plugin, str)) and self.filters.excluded(_qualified_name(target)):
+                return None
+        if isinstance(obj, Plugin):
+            child = obj.get_wrapper()
+        else:
+            child = ObjectWrapper.from_object(obj)
+        self._share_settings(child)
+        if self.include_children:
+            child.include_children = True
+        return child
+
+    @_cached_children
     def children(self) -> List[ObjectWrapper]:
         """Converts `self.object` to a list of children, each of which is a `DocumentedObject`."""
         children = []
         plugins = []
+        if self.outline is None:
+            self.outline = Outline()
 
         for obj in self.objects:
+            child = self._wrap(obj)
+            if child is None:
+                continue
             if isinstance(obj, Plugin):
-                child = obj.get_wrapper()
                 plugins.append(obj)
-            else:
-                child = ObjectWrapper.from_object(obj)
             children.append(child)
-            if self.include_children:
-                child.include_children = True
 
         plugins.append(IndentPostProcessing())
 
@@ -331,14 +1092,91 @@ class PackageWrapper(ObjectWrapper):
 
         return children
 
-    @_clean_up_docstring
+    def write(self, filename: str, unload_modules: bool = False):
+        """Writes the documentation to `filename` while keeping as little as possible in memory.
+
+        The objects are wrapped and rendered one at a time, and the output is written to a temporary file before the
+        next object is wrapped, so only the wrappers for one of `self.objects` exist at any time. Only the headings
+        (see `Outline`) are kept, for the tables of contents, which are filled in when the output is copied from the
+        temporary file to `filename`. `self.objects` may be any iterable, e.g. a generator which imports each module
+        when it is needed.
+
+        The `post_hook` of each plugin in `self.objects` is called with a list containing one wrapper at a time.
+
+        If `unload_modules` is True, each module that is rendered is removed from `sys.modules` (along with its
+        submodules), from the package it belongs to, and from the caches of the session, so that it can be garbage
+        collected unless it is referenced elsewhere.
+        """
+        if self.outline is None:
+            self.outline = Outline()
+        indentation = IndentPostProcessing()
+        deferred = []
+        length = 0
+        buffer = OutputBuffer()
+
+        with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as spool:
+            plugins = []
+            first = True
+            for obj in self.objects:
+                child = self._wrap(obj)
+                if child is None:
+                    continue
+                # Plugins without a post hook are not kept, since they may refer to modules that should be unloaded
+                if isinstance(obj, Plugin) and type(obj).post_hook is not Plugin.post_hook:
+                    plugins.append(obj)
+                for plugin in plugins + [indentation]:
+                    plugin.post_hook([child])
+
+                if not first:
+                    buffer.write("\n")
+                first = False
+                child.render(buffer)
+                for part in buffer.drain():
+                    if isinstance(part, str):
+                        spool.write(part)
+                        length += len(part)
+                    else:
+                        deferred.append((length, part))
+                del child
+
+                if unload_modules:
+                    module = obj.obj if isinstance(obj, IncludeChildren) else obj
+                    if inspect.ismodule(module):
+                        self._unload(module)
+
+            spool.seek(0)
+            with open(filename, "w") as file:
+                position = 0
+                for offset, text_function in deferred:
+                    while position < offset:
+                        chunk = spool.read(min(offset - position, 1 << 20))
+                        file.write(chunk)
+                        position += len(chunk)
+                    file.write(text_function())
+                shutil.copyfileobj(spool, file)
+
+    def _unload(self, module: types.ModuleType):
+        """Removes `module` and its submodules from `sys.modules`, from the package it belongs to and from the caches
+        of the session."""
+        name = module.__name__
+        for loaded in [loaded for loaded in sys.modules if loaded == name or loaded.startswith(name + ".")]:
+            del sys.modules[loaded]
+            if self.session is not None:
+                self.session.invalidate(loaded)
+        parent_name, _, child_name = name.rpartition(".")
+        parent = sys.modules.get(parent_name)
+        if parent is not None and getattr(parent, child_name, None) is module:
+            delattr(parent, child_name)
+
     def full_doc(self) -> str:
         """Returns a string with documentation for the module and all classes and functions defined there."""
-        docs = []
-        for child in self.children():
-            doc = child.full_doc()
-            docs.append(doc)
-        return "\n".join(docs)
+        return self._full_doc_from_render()
+
+    def render(self, buffer: OutputBuffer):
+        for i, child in enumerate(self.children()):
+            if i:
+                buffer.write("\n")
+            child.render(buffer)
 
 
 class Plugin(object):
@@ -349,8 +1187,8 @@ class Plugin(object):
     * `get_wrapper` should return an instance of `ObjectWrapper`. That instance's `full_doc()`, `oneliner()` and `text()`
       methods will be used to add text into the output. If not implemented, an `ObjectWrapper(None)` will be returned,
       which will not add any text to the input.
-    * `post_hook` takes in a list of `ObjectWrapper` objects. This is used in e.g. the `TableOfContents` plugin to let
-      the corresponding `ObjectWrapper` call each of their `oneliner()` methods to generate a table of contents.
+    * `post_hook` takes in a list of `ObjectWrapper` objects. This is used in e.g. the `IndentPostProcessing` plugin
+      to adjust the heading levels of the objects that follow an `Indent()`.
     """
 
     def __init__(self):
@@ -408,15 +1246,51 @@ class IncludeChildren(Plugin):
 
     * For a module, the children are the classes and functions defined within the module.
     * For a class, the children are the methods defined within the module.
+
+    If `inherited` is given, classes also include the public methods that they inherit from their base classes
+    (except builtin classes such as `object`), following the method resolution order. The methods of a base class are
+    rendered once and shared by all of its subclasses. The value decides what is emitted for them:
+
+    * `True` or `"copy"`: the documentation of the method is copied from the base class.
+    * `"reference"`: a heading with a reference to the base class is emitted.
+
+    For a module, this applies to all of its classes.
+
+    If `submodules` is True, the children of a package also include its public submodules, which are imported when
+    the documentation is generated.
+
+    If `include` or `exclude` is given, the children are filtered by their qualified names (see `NameFilter`).
+    Excluded submodules are not imported.
     """
 
-    def __init__(self, obj):
+    inherited_modes = ("copy", "reference")
+
+    def __init__(
+        self,
+        obj,
+        inherited: Union[bool, str] = False,
+        submodules: bool = False,
+        include: Union[str, list] = None,
+        exclude: Union[str, list] = None,
+    ):
         super().__init__()
+        if inherited is True:
+            inherited = "copy"
+        if inherited is not False and inherited not in self.inherited_modes:
+            raise ValueError(
+                "inherited must be True, False or one of {}, not {!r}".format(self.inherited_modes, inherited)
+            )
         self.obj = obj
+        self.inherited = inherited
+        self.submodules = submodules
+        self.filters = NameFilter(include, exclude) if include is not None or exclude is not None else None
 
     def get_wrapper(self):
         obj = ObjectWrapper.from_object(self.obj)
         obj.include_children = True
+        obj.inherited = self.inherited
+        obj.submodules = self.submodules
+        obj.filters = self.filters
         return obj
 
 
@@ -428,24 +1302,32 @@ class HorizontalLine(Plugin):
 
 
 class TableOfContents(Plugin):
-    """Add `TableOfContents()` to the list of objects passed to `document()` to insert a table of contents.
+    """Add `TableOfContents()` to the list of objects passed to `document()` to insert a table of contents, with an
+    entry linking to the heading of each documented module, class and function.
 
-    It is only supported to have one TableOfContents.
+    The entries are collected while the rest of the documentation is rendered, so a table of contents may be placed
+    anywhere and there may be several of them.
 
-    The `header` argument, if provided, changes the heading for the table of contents.
+    * `header`, if provided, changes the heading for the table of contents. If it is None, there is no heading.
+    * `max_depth`, if provided, limits how deeply nested the entries may be. With `max_depth=1`, only the outermost
+      headings are included.
+    * `module`, if provided, is a module (or the name of one), and restricts the table of contents to the headings
+      within the documentation for that module.
     """
 
-    def __init__(self, header: str = "Table of Contents"):
+    def __init__(
+        self,
+        header: Union[str, None] = "Table of Contents",
+        max_depth: int = None,
+        module: Union[types.ModuleType, str] = None,
+    ):
         super().__init__()
         self.header = header
-        self.wrapper = None
+        self.max_depth = max_depth
+        self.module = module.__name__ if inspect.ismodule(module) else module
 
     def get_wrapper(self):
-        self.wrapper = TableOfContentsWrapper(self.header)
-        return self.wrapper
-
-    def post_hook(self, children):
-        self.wrapper.objects = children
+        return TableOfContentsWrapper(self.header, self.max_depth, self.module)
 
 
 class IndentWrapper(ObjectWrapper):
@@ -459,59 +1341,92 @@ class DedentWrapper(ObjectWrapper):
 
 
 class IndentPostProcessing(Plugin):
+    def __init__(self):
+        super().__init__()
+        self.indent = 0
+
     def post_hook(self, children: List[ObjectWrapper]):
-        indent = 0
+        """Adjusts the heading levels of `children`. The indentation carries over to the next call, so the children
+        may also be passed in one at a time."""
 
         def fix_indent(obj):
-            nonlocal indent
             if isinstance(obj, IndentWrapper):
-                indent += 1
+                self.indent += 1
             elif isinstance(obj, DedentWrapper):
-                indent -= 1
-            obj.heading_level += indent
+                self.indent -= 1
+            obj.heading_level += self.indent
             if obj.include_children:
-                indent += 1
+                self.indent += 1
                 for child in obj.children():
                     fix_indent(child)
-                indent -= 1
+                self.indent -= 1
 
         for child in children:
             fix_indent(child)
 
 
 class TableOfContentsWrapper(ObjectWrapper):
-    def __init__(self, header):
+    def __init__(self, header: Union[str, None], max_depth: int = None, module: str = None):
         super().__init__(None)
-        self.objects = []
         self.header = header
+        self.max_depth = max_depth
+        self.module = module
+        self.links = None
+
+    def entries(self) -> List[tuple]:
+        """Returns a list of `(indent, index)` for each entry in the table of contents, where `index` refers to a
+        heading in `self.outline`."""
+        if self.outline is None:
+            return []
+        headings = self.outline.headings
+        start = 0
+        end = len(headings)
+        if self.module is not None:
+            start = next(
+                (
+                    i + 1
+                    for i, heading in enumerate(headings)
+                    if heading.name == self.module and issubclass(heading.wrapper_type, ModuleWrapper)
+                ),
+                end,
+            )
+            if start < end:
+                level = headings[start - 1].level
+                end = next((i for i in range(start, end) if headings[i].level <= level), end)
+
+        entries = []
+        levels = []
+        for i in range(start, end):
+            heading = headings[i]
+            if heading.wrapper_type is None:
+                continue
+            while levels and levels[-1] >= heading.level:
+                levels.pop()
+            if self.max_depth is None or len(levels) < self.max_depth:
+                entries.append((len(levels), i))
+            levels.append(heading.level)
+
+        return entries
 
     def full_doc(self) -> str:
-        output = ["# {}".format(self.header), ""]
-        indent = 0
-
-        def add_line(obj):
-            nonlocal indent
+        """Returns the table of contents, with each entry linking to the anchor of its heading. If `self.links` is
+        set, it should be a dict from the index of each heading to the link target (or None) to use instead."""
+        output = ["# {}".format(self.header), ""] if self.header else []
 
-            if isinstance(obj, IndentWrapper):
-                indent += 1
-            elif isinstance(obj, DedentWrapper):
-                indent -= 1
-
-            oneliner = obj.oneliner()
-            if oneliner:
-                line = "    " * indent + "* `" + oneliner + "`"
-                output.append(line)
-            if obj.include_children:
-                indent += 1
-                for child in obj.children():
-                    add_line(child)
-                indent -= 1
-
-        for obj in self.objects:
-            add_line(obj)
+        for indent, i in self.entries():
+            heading = self.outline.headings[i]
+            target = "#" + heading.anchor if self.links is None else self.links.get(i)
+            entry = heading.text if target is None else "[{}]({})".format(heading.text, target)
+            output.append("    " * indent + "* " + entry)
 
         return "\n".join(output)
 
+    def render(self, buffer: OutputBuffer):
+        if self.header and self.outline is not None:
+            self.outline.add_heading(self.header, 1)
+        buffer.write_deferred(self.full_doc)
+        buffer.write("\n")
+
 
 class HorizontalLineWrapper(ObjectWrapper):
     def __init__(self):
@@ -521,7 +1436,1352 @@ class HorizontalLineWrapper(ObjectWrapper):
         return "\n---\n"
 
 
-def document(objects: list, filename: str):
+class SearchIndex(object):
+    """Inverted index from tokens to the documented objects, saved as compact JSON for client-side search.
+
+    Objects are added with `add()` while the documentation is rendered, and grouped by the module they belong to.
+    The saved file has the following layout:
+
+        {"version": 2, "modules": {module_name: {"hash": ..., "objects": [[name, anchor], ...],
+                                                "tokens": {token: [object_index, delta, delta, ...]}}}}
+
+    where each `name` is the qualified name of the object relative to the module (empty for the module itself). The
+    objects that a token occurs in are listed in ascending order, as the index of the first one in the `objects` list
+    of the same module followed by the difference from each index to the next. When the output is split into several
+    pages, each object is `[name, anchor, page]` instead, where `page` is the filename of the page the anchor is on
+    (see `relink()`). When saving over an existing index, modules whose content did not change are copied over from
+    the old file without being tokenized again.
+
+    The tokens in the names of objects are always indexed. Tokens in the headings and docstrings are left out if they
+    are in `stopwords`, or if they occur in more than `max_token_share` of the objects in a module (and in more than
+    `min_token_cutoff` objects), since they would match nearly everything.
+    """
+
+    version = 2
+    token_pattern = re.compile(r"\w+")
+    stopwords = frozenset(
+        "an and are as at be by can for from has have if in into is it its not of on or that the then this to was "
+        "were when which will with self cls".split()
+    )
+    max_token_share = 0.5
+    min_token_cutoff = 5
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.anchors = _AnchorCounter()
+
+    def add(self, obj: object, heading: str, doc: str, anchor: str = None):
+        """Adds an object to the index, given the text of its heading and its docstring.
+
+        `anchor` should be the anchor of the heading in the output (see `Outline`). If it is not given, it is generated
+        from the headings passed to `add()`."""
+        if anchor is None:
+            anchor = self.anchors(heading)
+
+        if inspect.ismodule(obj):
+            module = obj.__name__
+            name = ""
+        else:
+            module = getattr(obj, "__module__", None) or ""
+            name = _qualified_name(obj)[len(module) :].lstrip(".")
+
+        self.entries.setdefault(module, []).append((name, anchor, heading, doc, ""))
+
+    def relink(self, targets: Dict[str, tuple]):
+        """Moves the entries to other pages, given a dict from the anchor of each entry to a tuple `(page, anchor)`
+        with the filename of its page and its anchor on that page."""
+        for module, entries in self.entries.items():
+            relinked = []
+            for name, anchor, heading, doc, page in entries:
+                page, anchor = targets.get(anchor, (page, anchor))
+                relinked.append((name, anchor, heading, doc, page))
+            self.entries[module] = relinked
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Splits `text` into lowercase search tokens. Identifiers are indexed both whole and split on underscores."""
+        tokens = []
+        for word in cls.token_pattern.findall(text.lower()):
+            tokens.append(word)
+            if "_" in word:
+                tokens.extend(part for part in word.split("_") if part)
+        return [token for token in tokens if len(token) > 1]
+
+    def _module_hash(self, entries: list) -> str:
+        digest = hashlib.sha1()
+        for entry in entries:
+            for field in entry:
+                digest.update(field.encode("utf-8"))
+                digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _module_index(self, entries: list) -> dict:
+        objects = []
+        name_tokens = {}
+        text_tokens = {}
+        for i, (name, anchor, heading, doc, page) in enumerate(entries):
+            objects.append([name, anchor, page] if page else [name, anchor])
+            names = set(self.tokenize(name))
+            for token in names:
+                name_tokens.setdefault(token, []).append(i)
+            for token in set(self.tokenize(heading + " " + doc)) - names - self.stopwords:
+                text_tokens.setdefault(token, []).append(i)
+
+        cutoff = max(self.max_token_share * len(entries), self.min_token_cutoff)
+        tokens = {}
+        for token in sorted(set(name_tokens).union(text_tokens)):
+            indices = name_tokens.get(token, [])
+            if len(text_tokens.get(token, ())) <= cutoff:
+                indices = sorted(indices + text_tokens.get(token, []))
+            if indices:
+                tokens[token] = [indices[0]] + [b - a for a, b in zip(indices, indices[1:])]
+        return {"objects": objects, "tokens": tokens}
+
+    def to_dict(self, previous: dict = None) -> dict:
+        """Returns the index as a JSON-serializable dict.
+
+        If `previous` is given, it should be an index returned by an earlier call to `to_dict()`. The parts of it
+        that belong to unchanged modules are reused."""
+        old_modules = {}
+        if previous is not None and previous.get("version") == self.version:
+            old_modules = previous.get("modules", {})
+
+        modules = OrderedDict()
+        for module, entries in self.entries.items():
+            module_hash = self._module_hash(entries)
+            old_module = old_modules.get(module)
+            if old_module is not None and old_module.get("hash") == module_hash:
+                modules[module] = old_module
+            else:
+                modules[module] = OrderedDict(hash=module_hash)
+                modules[module].update(self._module_index(entries))
+
+        return {"version": self.version, "modules": modules}
+
+    def save(self, filename: str):
+        """Writes the index to `filename`, reusing the parts of an existing index there that are still valid.
+
+        The file is left untouched if nothing changed."""
+        previous = None
+        if os.path.exists(filename):
+            try:
+                with open(filename) as file:
+                    previous = json.load(file)
+            except ValueError:
+                previous = None
+
+        index = self.to_dict(previous)
+        if index == previous:
+            return
+
+        with open(filename, "w") as file:
+            file.write(json.dumps(index, separators=(",", ":")))
+
+
+class ApiHashes(object):
+    """Hashes of the signature and docstring of each documented object, for finding out what changed in the API
+    between two versions of a package without comparing the documentation itself.
+
+    Objects are added with `add()`, either while the documentation is rendered or by `api_hashes()`. The saved file
+    has the following layout:
+
+        {"version": 1, "objects": {qualified_name: [signature_hash, docstring_hash], ...}}
+
+    Whitespace in the docstrings is normalized before hashing, so reformatting a docstring does not count as a change.
+    Use `diff()` to compare two such files.
+    """
+
+    version = 1
+
+    def __init__(self):
+        self.objects = OrderedDict()
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    def add(self, obj: object, signature: str, doc: str):
+        """Adds an object, given its one-line signature and its docstring."""
+        self.objects[_qualified_name(obj)] = [self._hash(signature), self._hash(" ".join(doc.split()))]
+
+    def to_dict(self) -> dict:
+        """Returns the hashes as a JSON-serializable dict."""
+        return {"version": self.version, "objects": self.objects}
+
+    def save(self, filename: str):
+        """Writes the hashes to `filename`."""
+        with open(filename, "w") as file:
+            file.write(json.dumps(self.to_dict(), separators=(",", ":")))
+
+    @classmethod
+    def load(cls, filename: str) -> dict:
+        """Reads a file written by `save()` and returns the dict."""
+        with open(filename) as file:
+            hashes = json.load(file)
+        if hashes.get("version") != cls.version:
+            raise ValueError("{} is not an API hash file of version {}".format(filename, cls.version))
+        return hashes
+
+    @staticmethod
+    def diff(old: dict, new: dict) -> Dict[str, list]:
+        """Compares two dicts returned by `to_dict()` or `load()`, and returns a dict with the following items:
+
+        * `"added"`: the qualified names that are only in `new`
+        * `"removed"`: the qualified names that are only in `old`
+        * `"changed"`: a list of `(qualified_name, changes)` for the objects that are in both, where `changes` is a
+          list containing `"signature"` and/or `"docstring"`
+
+        The names are in the same order as in the files."""
+        old_objects = old["objects"]
+        new_objects = new["objects"]
+        added = []
+        changed = []
+        for name, (signature_hash, doc_hash) in new_objects.items():
+            if name not in old_objects:
+                added.append(name)
+                continue
+            old_signature_hash, old_doc_hash = old_objects[name]
+            changes = []
+            if signature_hash != old_signature_hash:
+                changes.append("signature")
+            if doc_hash != old_doc_hash:
+                changes.append("docstring")
+            if changes:
+                changed.append((name, changes))
+        removed = [name for name in old_objects if name not in new_objects]
+        return {"added": added, "removed": removed, "changed": changed}
+
+
+def _fragment_key(wrapper: ObjectWrapper) -> tuple:
+    """Returns the settings of `wrapper` that affect its rendered documentation, other than the object itself."""
+    return (
+        type(wrapper),
+        wrapper.heading_level,
+        wrapper.include_children,
+        wrapper.inherited,
+        wrapper.inherited_from is not None,
+        frozenset(wrapper.includes),
+        frozenset(wrapper.excludes),
+        wrapper.filters,
+        wrapper.submodules,
+        id(wrapper.docstring_parser),
+        id(wrapper.templates),
+        id(wrapper.source_links),
+    )
+
+
+# The reference that `Registry` writes for a later occurrence of an object in `"link"` mode
+_registry_link_pattern = re.compile(r"^(See \[`.*`\]\()#([^)\s]*)(\)\.)$", re.MULTILINE)
+
+
+class Registry(object):
+    """Keeps track of the objects that are rendered during one call to `document()`, keyed by their identity and
+    qualified name.
+
+    When the same module, class or function is reachable through several paths, only its first occurrence is
+    rendered, unless a later occurrence includes more children (e.g. `IncludeChildren(cls)` after `cls`), in which
+    case that occurrence is rendered as well and becomes the one that is referred to. Later occurrences are handled
+    according to `mode`:
+
+    * `"link"`: a heading with a link to the first occurrence is emitted.
+    * `"reference"`: a heading with a reference to the qualified name of the object is emitted.
+    * `"copy"`: the rendering of the first occurrence is copied. An occurrence with a different heading level or
+      different settings for including children (the same settings that `DocSession` caches fragments by) is
+      rendered again, but only once per combination of settings.
+
+    Only `"copy"` keeps the rendered documentation in memory until the end of the build.
+    """
+
+    modes = ("link", "reference", "copy")
+
+    def __init__(self, mode: str = "link"):
+        if mode not in self.modes:
+            raise ValueError("mode must be one of {}, not {!r}".format(self.modes, mode))
+        self.mode = mode
+        self.rendered = {}
+        self._recordings = []
+
+    def record(self, record: _HeadingRecord, anchor: str = None):
+        """Called from `ObjectWrapper._emit()` for every heading that is rendered, with the anchor of the heading in
+        the output (see `Outline`)."""
+        if anchor is None:
+            anchor = _anchor(record.signature)
+        for recording in self._recordings:
+            # Only the first heading is needed unless the rendering is copied
+            if self.mode == "copy" or not recording:
+                recording.append((record, anchor))
+
+    def _render(self, wrapper: ObjectWrapper, render, buffer: OutputBuffer) -> list:
+        """Calls `render(wrapper, buffer)`, and returns the `(record, anchor)` of the headings that were rendered."""
+        recording = []
+        self._recordings.append(recording)
+        try:
+            render(wrapper, buffer)
+        finally:
+            self._recordings.pop()
+        return recording
+
+    def render(self, wrapper: ObjectWrapper, render, buffer: OutputBuffer):
+        """Writes the documentation for `wrapper` to `buffer`, calling `render(wrapper, buffer)` only if its object
+        was not rendered before."""
+        name = _qualified_name(wrapper.obj)
+        key = (id(wrapper.obj), name)
+        if self.mode == "copy":
+            variants = self.rendered.setdefault(key, {})
+            variant = _fragment_key(wrapper)
+            if variant in variants:
+                text, recording = variants[variant]
+                for record, _ in recording:
+                    wrapper._emit(record)
+            else:
+                fragment = OutputBuffer()
+                recording = self._render(wrapper, render, fragment)
+                text = fragment.getvalue()
+                variants[variant] = (text, recording)
+            buffer.write(text)
+            return
+
+        children = len(wrapper.children()) if wrapper.include_children else 0
+        entry = self.rendered.get(key)
+        if entry is None or children > entry[2]:
+            recording = self._render(wrapper, render, buffer)
+            if recording:
+                record, anchor = recording[0]
+                self.rendered[key] = (record.signature, anchor, children)
+            return
+
+        signature, anchor, _ = entry
+        if wrapper.outline is not None:
+            wrapper.outline.add_heading("`" + signature + "`", wrapper.heading_level, type(wrapper), name)
+        if self.mode == "link":
+            reference = "See [`{}`](#{}).".format(signature, anchor)
+        else:
+            reference = "See `{}`.".format(name)
+        buffer.write("{} `{}`\n\n{}\n".format("#" * wrapper.heading_level, signature, reference))
+
+
+_OutlineHeading = namedtuple("_OutlineHeading", "text level wrapper_type name anchor")
+
+
+class Outline(object):
+    """Records every heading in the documentation while it is rendered.
+
+    `headings` is a list of `(text, level, wrapper_type, name, anchor)` in the order the headings appear in the output:
+
+    * `text` is the text of the heading as it appears in the Markdown output, without any link to the source code
+    * `wrapper_type` and `name` are the type of wrapper and the qualified name of the documented object, or None for
+      other headings (e.g. those in Markdown files)
+    * `anchor` is the collision-free anchor that GitHub generates for the heading
+    """
+
+    def __init__(self):
+        self.headings = []
+        self.anchors = _AnchorCounter()
+
+    def add(self, record: _HeadingRecord) -> str:
+        """Called from `ObjectWrapper._emit()` for every heading that is rendered. Returns the anchor of the heading."""
+        return self.add_heading(
+            "`" + record.signature + "`", record.heading_level, record.wrapper_type, _qualified_name(record.obj)
+        )
+
+    def add_heading(self, text: str, level: int, wrapper_type: type = None, name: str = None) -> str:
+        """Adds a heading with the given text and level, and returns its anchor."""
+        anchor = self.anchors(text)
+        self.headings.append(_OutlineHeading(text, level, wrapper_type, name, anchor))
+        return anchor
+
+
+class Paginator(object):
+    """Splits the documentation for a package into several pages, and generates an index page linking to them.
+
+    Pages are only split before the headings of modules, classes and functions and the headings in Markdown files, so
+    the documentation for a class is never split. If `max_page_bytes` is given, as many sections as possible are put
+    on each page without exceeding that size (a single section that is larger than the limit gets a page of its own).
+    If `split_modules` is True, each module starts on a new page.
+
+    The pages are named after `filename`, so that `README.md` is split into `README_1.md`, `README_2.md` and so on,
+    while `filename` itself becomes the index page. Links in tables of contents point to the right page.
+    """
+
+    def __init__(self, filename: str, max_page_bytes: int = None, split_modules: bool = False):
+        self.filename = filename
+        self.max_page_bytes = max_page_bytes
+        self.split_modules = split_modules
+
+    def page_filename(self, number: int) -> str:
+        """Returns the filename of the page with the given number (starting from 1)."""
+        root, ext = os.path.splitext(self.filename)
+        return "{}_{}{}".format(root, number, ext)
+
+    def _headings(self, lines: List[str]):
+        """Yields `(line_number, level, text)` for each heading in `lines` that is not part of a code block."""
+        return _markdown_headings(lines)
+
+    @staticmethod
+    def _outline_indices(texts: List[str], outline: "Outline") -> List[Union[int, None]]:
+        """Returns the index in `outline.headings` of each of the headings with the given texts, which are in the order
+        they appear in the output, or None for the headings that are not in the outline (e.g. those in docstrings)."""
+        indices = []
+        position = 0
+        for text in texts:
+            if position < len(outline.headings) and outline.headings[position].text == text:
+                indices.append(position)
+                position += 1
+            else:
+                indices.append(None)
+        return indices
+
+    def _sections(self, documentation: str, outline: "Outline") -> List[tuple]:
+        """Splits the documentation into a list of `(text, starts_module)` at the headings where pages may start.
+
+        Pages may start at the headings in the outline, except those of methods. Other headings (e.g. those in
+        docstrings) never start a page."""
+        lines = documentation.split("\n")
+        headings = list(self._headings(lines))
+        indices = self._outline_indices([text for _, _, text in headings], outline)
+        starts = [(0, False)]
+        for (i, _, _), index in zip(headings, indices):
+            if index is None or i == 0:
+                continue
+            kind = outline.headings[index].wrapper_type
+            if not (kind and issubclass(kind, MethodWrapper)):
+                starts.append((i, bool(kind and issubclass(kind, ModuleWrapper))))
+        starts.append((len(lines), False))
+
+        return [
+            ("\n".join(lines[start:end]), starts_module)
+            for (start, starts_module), (end, _) in zip(starts, starts[1:])
+        ]
+
+    def _pages(self, sections: List[tuple]) -> List[str]:
+        pages = []
+        current = []
+        size = 0
+        for text, starts_module in sections:
+            section_size = len(text.encode("utf-8")) + 1
+            new_page = self.split_modules and starts_module
+            if self.max_page_bytes is not None:
+                new_page |= size + section_size > self.max_page_bytes
+            if current and new_page:
+                pages.append("\n".join(current))
+                current = []
+                size = 0
+            current.append(text)
+            size += section_size
+        if current:
+            pages.append("\n".join(current))
+        return pages
+
+    def paginate(self, package: PackageWrapper) -> "OrderedDict[str, str]":
+        """Renders `package` and returns an ordered dict from filename to content for the index and each page."""
+        if package.outline is None:
+            package.outline = Outline()
+        documentation = package.full_doc()
+        sections = self._sections(documentation, package.outline)
+        pages = self._pages(sections)
+
+        # Find where each heading ends up, with anchors generated per page like GitHub does
+        headings = []
+        titles = []
+        for number, page in enumerate(pages, 1):
+            anchors = _AnchorCounter()
+            page_headings = [
+                (text, number, anchors(text)) for _, _, text in self._headings(page.split("\n"))
+            ]
+            headings.extend(page_headings)
+            titles.append(page_headings[0][0] if page_headings else "Page {}".format(number))
+
+        # Match the headings in the outline with those on the pages, giving `(page_number, anchor)` for each
+        indices = self._outline_indices([text for text, _, _ in headings], package.outline)
+        targets = {index: heading[1:] for heading, index in zip(headings, indices) if index is not None}
+
+        if package.search_index is not None:
+            package.search_index.relink(
+                {
+                    package.outline.headings[index].anchor: (os.path.basename(self.page_filename(number)), anchor)
+                    for index, (number, anchor) in targets.items()
+                }
+            )
+
+        # Point the links to earlier occurrences of duplicate objects (see `Registry`) to the right pages
+        anchor_targets = {package.outline.headings[index].anchor: target for index, target in targets.items()}
+        for page_number, page in enumerate(pages, 1):
+
+            def relink(match):
+                if match.group(2) not in anchor_targets:
+                    return match.group(0)
+                number, anchor = anchor_targets[match.group(2)]
+                page_name = "" if number == page_number else os.path.basename(self.page_filename(number))
+                return "{}{}#{}{}".format(match.group(1), page_name, anchor, match.group(3))
+
+            pages[page_number - 1] = _registry_link_pattern.sub(relink, page)
+
+        # Link the tables of contents to the right pages
+        for toc in package.children():
+            if not isinstance(toc, TableOfContentsWrapper):
+                continue
+            single_page = toc.full_doc()
+            toc_page = next((n for n, page in enumerate(pages, 1) if single_page and single_page in page), None)
+            links = {}
+            for _, index in toc.entries():
+                if index in targets:
+                    number, anchor = targets[index]
+                    if number == toc_page:
+                        links[index] = "#" + anchor
+                    else:
+                        links[index] = os.path.basename(self.page_filename(number)) + "#" + anchor
+            toc.links = links
+            if toc_page is not None:
+                pages[toc_page - 1] = pages[toc_page - 1].replace(single_page, toc.full_doc(), 1)
+
+        output = OrderedDict()
+        index = ["# Pages", ""]
+        for number, (page, title) in enumerate(zip(pages, titles), 1):
+            page_filename = self.page_filename(number)
+            index.append("* [{}]({})".format(title, os.path.basename(page_filename)))
+            output[page_filename] = page
+        output[self.filename] = "\n".join(index) + "\n"
+        output.move_to_end(self.filename, last=False)
+        return output
+
+    def remove_stale_pages(self, count: int):
+        """Removes the pages numbered above `count` that were left over from an earlier build with more pages."""
+        number = count + 1
+        while os.path.exists(self.page_filename(number)):
+            os.remove(self.page_filename(number))
+            number += 1
+
+
+def _write_if_changed(filename: str, content: str) -> bool:
+    """Writes `content` to `filename` unless the file already has exactly that content. Returns whether the file was
+    written."""
+    try:
+        with open(filename) as file:
+            if file.read() == content:
+                return False
+    except (IOError, UnicodeDecodeError):
+        pass
+
+    with open(filename, "w") as file:
+        file.write(content)
+    return True
+
+
+class ParsedDocstring(object):
+    """The result of `DocstringParser.parse()`.
+
+    `description` is the free text of the docstring, and `sections` maps section titles such as `"Arguments"` or
+    `"Raises"` to lists of `(name, type, description)` tuples. Any part of a tuple may be empty. `layout` is the order
+    in which they appear in the docstring: a list of the blocks of free text and the section titles. By default, the
+    description comes before all sections."""
+
+    def __init__(self, description: str = "", sections: dict = None, layout: list = None):
+        self.description = description
+        self.sections = OrderedDict() if sections is None else sections
+        self.layout = [description] + list(self.sections) if layout is None else layout
+
+    def __repr__(self):
+        return "<ParsedDocstring {!r} {!r}>".format(self.description, dict(self.sections))
+
+    def __eq__(self, other: "ParsedDocstring") -> bool:
+        try:
+            return (self.description, self.sections) == (other.description, other.sections)
+        except AttributeError:
+            return False
+
+
+class DocstringParser(object):
+    """Parses Google, NumPy and reST style docstrings so that their sections can be rendered as Markdown.
+
+    Pass an instance to `document()` to render the Args/Returns/Raises sections of all docstrings as tables and lists.
+    Each docstring is parsed in a single pass over its lines, and both the parse and the rendered Markdown are cached
+    per docstring, so boilerplate docstrings shared by many methods are only processed once.
+    """
+
+    section_titles = {
+        "args": "Arguments",
+        "arguments": "Arguments",
+        "parameters": "Arguments",
+        "params": "Arguments",
+        "keyword args": "Keyword arguments",
+        "keyword arguments": "Keyword arguments",
+        "other parameters": "Other arguments",
+        "attributes": "Attributes",
+        "returns": "Returns",
+        "return": "Returns",
+        "yields": "Yields",
+        "yield": "Yields",
+        "raises": "Raises",
+        "exceptions": "Raises",
+        "warns": "Warns",
+    }
+    field_titles = {
+        "param": "Arguments",
+        "parameter": "Arguments",
+        "arg": "Arguments",
+        "argument": "Arguments",
+        "key": "Keyword arguments",
+        "keyword": "Keyword arguments",
+        "ivar": "Attributes",
+        "returns": "Returns",
+        "return": "Returns",
+        "yields": "Yields",
+        "yield": "Yields",
+        "raises": "Raises",
+        "raise": "Raises",
+        "except": "Raises",
+        "exception": "Raises",
+    }
+    field_types = {"type": "Arguments", "rtype": "Returns", "ytype": "Yields"}
+    table_sections = {"Arguments", "Keyword arguments", "Other arguments", "Attributes"}
+
+    def __init__(self):
+        self._parsed = {}
+        self._rendered = {}
+
+    def parse(self, text: str) -> ParsedDocstring:
+        """Returns the parsed version of the docstring `text`."""
+        parsed = self._parsed.get(text)
+        if parsed is None:
+            parsed = self._parse(text)
+            self._parsed[text] = parsed
+        return parsed
+
+    def render(self, text: str) -> str:
+        """Returns the docstring `text` as Markdown, with its sections formatted as tables and lists."""
+        rendered = self._rendered.get(text)
+        if rendered is None:
+            rendered = self._render(self.parse(text))
+            self._rendered[text] = rendered
+        return rendered
+
+    def _parse(self, text: str) -> ParsedDocstring:
+        sections = OrderedDict()
+        description = []
+        style = None
+        title = None
+        section_indent = 0
+        item = None
+        item_indent = 0
+
+        layout = []
+        placed = set()
+        block = []
+
+        def add_text(line):
+            description.append(line)
+            block.append(line)
+
+        def add_sections(titles):
+            titles = [title for title in titles if title not in placed]
+            if titles and "\n".join(block).strip():
+                layout.append("\n".join(block).strip())
+                del block[:]
+            layout.extend(titles)
+            placed.update(titles)
+
+        lines = text.split("\n")
+        underlined = False
+        in_code = False
+        for i, line in enumerate(lines):
+            if underlined:
+                # The underline of a NumPy section header
+                underlined = False
+                continue
+
+            stripped = line.strip()
+            indent = len(line) - len(line.lstrip())
+
+            # Code blocks are kept as they are, and end the current section
+            if in_code or stripped.startswith("```"):
+                if stripped.startswith("```"):
+                    in_code = not in_code
+                style = None
+                add_text(line)
+                continue
+
+            # reST fields
+            if stripped.startswith(":"):
+                field = self._parse_field(stripped, sections)
+                if field is not None:
+                    add_sections(sections)
+                    style, item, item_indent = "field", field, indent
+                    continue
+
+            # Section headers
+            if stripped and (style is None or indent <= section_indent):
+                underlined = i + 1 < len(lines) and _is_underline(lines[i + 1])
+                key = stripped[:-1] if stripped.endswith(":") else stripped
+                section_title = self.section_titles.get(key.lower())
+                if section_title is not None and (underlined or stripped.endswith(":")):
+                    style = "numpy" if underlined else "google"
+                    title = section_title
+                    section_indent = indent
+                    item = None
+                    sections.setdefault(title, [])
+                    add_sections([title])
+                    continue
+                if underlined:
+                    # Some other NumPy section, which is kept as text
+                    style = None
+                    add_text(line)
+                    add_text(lines[i + 1])
+                    continue
+
+            if style == "field":
+                if not stripped:
+                    continue
+                if indent > item_indent:
+                    item[2].append(stripped)
+                    continue
+                style = None
+            elif style == "google":
+                if not stripped:
+                    continue
+                if indent > section_indent:
+                    if item is not None and indent > item_indent:
+                        item[2].append(stripped)
+                        continue
+                    new_item = self._parse_google_item(title, stripped)
+                    if new_item is None:
+                        if item is not None:
+                            item[2].append(stripped)
+                            continue
+                        new_item = ["", "", [stripped]]
+                    item, item_indent = new_item, indent
+                    sections[title].append(item)
+                    continue
+                style = None
+            elif style == "numpy":
+                if not stripped:
+                    continue
+                if indent > section_indent and item is not None:
+                    item[2].append(stripped)
+                    continue
+                if indent >= section_indent:
+                    item = self._parse_numpy_item(title, stripped)
+                    sections[title].append(item)
+                    continue
+                style = None
+
+            add_text(line)
+
+        for title, items in sections.items():
+            sections[title] = [
+                (name, type_, " ".join(desc).strip()) for name, type_, desc in items
+            ]
+        if "\n".join(block).strip():
+            layout.append("\n".join(block).strip())
+
+        return ParsedDocstring("\n".join(description).strip(), sections, layout)
+
+    def _parse_field(self, stripped: str, sections: dict) -> Union[list, None]:
+        end = stripped.find(":", 1)
+        if end == -1:
+            return None
+        field = stripped[1:end].split()
+        rest = stripped[end + 1 :].strip()
+        if not field:
+            return None
+
+        kind = field[0].lower()
+        if kind in self.field_types:
+            title = self.field_types[kind]
+            name = field[1] if len(field) > 1 else ""
+            items = sections.setdefault(title, [])
+            for item in items:
+                if item[0] == name:
+                    break
+            else:
+                item = [name, "", []]
+                items.append(item)
+            item[1] = rest
+            return [name, rest, []]
+
+        title = self.field_titles.get(kind)
+        if title is None:
+            return None
+
+        if title in self.table_sections:
+            name = field[-1] if len(field) > 1 else ""
+            type_ = " ".join(field[1:-1])
+        else:
+            name = ""
+            type_ = " ".join(field[1:])
+
+        items = sections.setdefault(title, [])
+        for item in items:
+            if name and item[0] == name:
+                item[1] = item[1] or type_
+                item[2].append(rest)
+                return item
+        item = [name, type_, [rest]]
+        items.append(item)
+        return item
+
+    def _parse_google_item(self, title: str, stripped: str) -> Union[list, None]:
+        head, sep, rest = stripped.partition(":")
+        head = head.strip()
+        type_ = ""
+        if head.endswith(")") and "(" in head:
+            head, _, type_ = head[:-1].partition("(")
+            head = head.strip()
+        if not head or " " in head:
+            return None
+        if title in self.table_sections:
+            return [head, type_, [rest.strip()]]
+        if not sep:
+            return None
+        return ["", head, [rest.strip()]]
+
+    def _parse_numpy_item(self, title: str, stripped: str) -> list:
+        name, sep, type_ = stripped.partition(" : ")
+        if not sep:
+            if title in self.table_sections:
+                name, type_ = stripped.rstrip(":").strip(), ""
+            else:
+                name, type_ = "", stripped
+        return [name.strip(), type_.strip(), []]
+
+    def _render(self, parsed: ParsedDocstring) -> str:
+        output = []
+        for title in parsed.layout:
+            items = parsed.sections.get(title)
+            if items is None:
+                # A block of free text
+                output.append("")
+                output.append(title)
+                continue
+            if not items:
+                continue
+            output.append("")
+            output.append("**{}:**".format(title))
+            output.append("")
+            if title in self.table_sections:
+                output.append("| Name | Type | Description |")
+                output.append("| ---- | ---- | ----------- |")
+                for name, type_, description in items:
+                    output.append(
+                        "| {} | {} | {} |".format(
+                            _code(name), _code(type_), description.replace("|", "\\|")
+                        )
+                    )
+            else:
+                for name, type_, description in items:
+                    label = " ".join(_code(part) for part in (name, type_) if part)
+                    if label and description:
+                        output.append("* {}: {}".format(label, description))
+                    else:
+                        output.append("* {}".format(label or description))
+        return "\n".join(output).strip()
+
+
+def _is_underline(line: str) -> bool:
+    """Returns whether `line` is the underline of a NumPy-style section header."""
+    stripped = line.strip()
+    return len(stripped) >= 3 and not stripped.strip("-")
+
+
+def _code(text: str) -> str:
+    """Formats `text` as inline code, unless it is empty."""
+    return "`{}`".format(text) if text else ""
+
+
+class DocSession(object):
+    """Caches everything that can be reused between calls to `document()`, for use in long-running processes.
+
+    The session caches the following, per module:
+
+    * `"signatures"`: the output of `oneliner()` for each class and function
+    * `"children"`: the objects that are children of each module and class
+    * `"fragments"`: the rendered documentation for each object (unless `cache_fragments` is False)
+    * `"sources"`: the line numbers of the classes and functions in each source file (if `source_links` is given)
+
+    It also caches the contents of Markdown files (`"markdown"`), which are read again if the file is modified.
+
+    The caches are shared by all calls to `document()` on the session, which may be made from several threads at once.
+    When a module has been modified, call `invalidate()` with that module to remove everything that was cached for
+    it, including what was cached for other modules that depends on it (such as subclasses that document inherited
+    members, or packages that document their submodules). `stats()` returns the number of hits and misses for each
+    cache.
+
+    `docstring_parser`, `templates`, `source_links` and `source_root` are used for every call to `document()` (see
+    the function of the same name).
+    """
+
+    caches = ("signatures", "children", "fragments", "sources", "markdown")
+
+    def __init__(
+        self,
+        docstring_parser: DocstringParser = None,
+        templates: Dict[str, str] = None,
+        cache_fragments: bool = True,
+        source_links: str = None,
+        source_root: str = None,
+    ):
+        self.docstring_parser = docstring_parser
+        self.templates = Templates(templates) if templates is not None else None
+        self.cache_fragments = cache_fragments
+        self.source_links = SourceLinks(source_links, source_root) if source_links is not None else None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._modules = {}
+        self._dependents = {}
+        # The number of calls to `invalidate()`, and for each module (or None for all of them), the number at the time
+        # it was last invalidated
+        self._invalidations = 0
+        self._generations = {}
+        self._markdown = {}
+        self._stats = {cache: {"hits": 0, "misses": 0} for cache in self.caches}
+
+    def _lookup(self, cache: str, obj: object, key: object):
+        with self._lock:
+            caches = self._modules.get(_module_name(obj))
+            entry = caches and caches.get(cache, {}).get((id(obj), key))
+            self._stats[cache]["hits" if entry else "misses"] += 1
+        if entry:
+            self._depend(entry[2])
+        return entry
+
+    def _generation(self) -> int:
+        """Returns a number to pass to `_store()` as `since`, read before the value to be stored is computed."""
+        with self._lock:
+            return self._invalidations
+
+    def _store(
+        self, cache: str, obj: object, key: object, value: object, dependencies: Iterable[str] = (), since: int = None
+    ):
+        """Caches `value`, which is removed again when the module of `obj` or any of the modules in `dependencies`
+        is invalidated. If any of them was invalidated after `_generation()` returned `since`, the value may be
+        stale and is not cached."""
+        module = _module_name(obj)
+        dependencies = frozenset(dependencies) - {module}
+        with self._lock:
+            stale = since is not None and any(
+                self._generations.get(name, -1) > since for name in dependencies.union((module, None))
+            )
+            if not stale:
+                caches = self._modules.setdefault(module, {})
+                # The object itself is kept in the entry so that its id is not reused while the entry exists
+                caches.setdefault(cache, {})[(id(obj), key)] = (obj, value, dependencies)
+                for dependency in dependencies:
+                    self._dependents.setdefault(dependency, set()).add((module, cache, (id(obj), key)))
+        self._depend(dependencies)
+
+    def _depend(self, dependencies: Iterable[str]):
+        """Adds `dependencies` to the dependencies of the fragments that are being rendered in this thread."""
+        for fragment_dependencies in getattr(self._local, "dependencies", ()):
+            fragment_dependencies.update(dependencies)
+
+    def get(self, cache: str, obj: object, key: object, compute, dependencies=None):
+        """Returns the value cached for `obj` and `key` in the given cache, or caches and returns `compute()`.
+
+        If `dependencies` is given, it is called with the value and should return the names of the other modules that
+        the value was taken from."""
+        entry = self._lookup(cache, obj, key)
+        if entry:
+            return entry[1]
+        since = self._generation()
+        value = compute()
+        self._store(cache, obj, key, value, dependencies(value) if dependencies is not None else (), since)
+        return value
+
+    def markdown(self, filename: str) -> str:
+        """Returns the contents of the file `filename`."""
+        stat = os.stat(filename)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._markdown.get(filename)
+            hit = entry is not None and entry[0] == version
+            self._stats["markdown"]["hits" if hit else "misses"] += 1
+        if hit:
+            return entry[1]
+
+        with open(filename) as file:
+            text = file.read()
+        with self._lock:
+            self._markdown[filename] = (version, text)
+        return text
+
+    def record(self, record: _HeadingRecord):
+        """Called from `ObjectWrapper._emit()` for every heading that is rendered, so that the headings in a rendered
+        fragment can be passed on again when the fragment is reused."""
+        for recording in getattr(self._local, "recordings", ()):
+            recording.append(record)
+
+    def render(self, wrapper: ObjectWrapper, render, buffer: OutputBuffer):
+        """Writes the documentation for `wrapper` to `buffer`, calling `render(wrapper, buffer)` only if the same
+        object was not already rendered with the same settings.
+
+        Inherited methods are shared by all subclasses even if `cache_fragments` is False."""
+        if not self.cache_fragments and wrapper.inherited_from is None:
+            render(wrapper, buffer)
+            return
+
+        key = _fragment_key(wrapper)
+        entry = self._lookup("fragments", wrapper.obj, key)
+        if entry:
+            text, recording = entry[1]
+            for record in recording:
+                wrapper._emit(record)
+            buffer.write(text)
+            return
+
+        recording = []
+        dependencies = set()
+        if not hasattr(self._local, "recordings"):
+            self._local.recordings = []
+            self._local.dependencies = []
+        self._local.recordings.append(recording)
+        self._local.dependencies.append(dependencies)
+        since = self._generation()
+        fragment = OutputBuffer()
+        try:
+            render(wrapper, fragment)
+        finally:
+            self._local.recordings.pop()
+            self._local.dependencies.pop()
+
+        # The fragment also contains the documentation of objects from other modules, e.g. inherited methods
+        dependencies.update(_module_name(record.obj) for record in recording)
+        text = fragment.getvalue()
+        self._store("fragments", wrapper.obj, key, (text, recording), dependencies, since)
+        buffer.write(text)
+
+    def invalidate(self, module: Union[types.ModuleType, str] = None):
+        """Removes everything that was cached for `module` (a module or the name of one), and everything cached for
+        other modules that depends on it. If no module is given, all caches are cleared."""
+        with self._lock:
+            self._invalidations += 1
+            if module is None:
+                self._modules.clear()
+                self._dependents.clear()
+                self._markdown.clear()
+                self._generations = {None: self._invalidations}
+            else:
+                name = module if isinstance(module, str) else module.__name__
+                self._generations[name] = self._invalidations
+                self._modules.pop(name, None)
+                for owner, cache, entry_key in self._dependents.pop(name, ()):
+                    self._modules.get(owner, {}).get(cache, {}).pop(entry_key, None)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Returns a dict from the name of each cache to a dict with its number of `"hits"` and `"misses"`."""
+        with self._lock:
+            return {cache: dict(stats) for cache, stats in self._stats.items()}
+
+    def document(
+        self,
+        objects: list,
+        filename: str,
+        search_index: str = None,
+        duplicates: str = None,
+        max_page_bytes: int = None,
+        split_modules: bool = False,
+        api_hashes: str = None,
+        include: Union[str, list] = None,
+        exclude: Union[str, list] = None,
+        low_memory: bool = False,
+        unload_modules: bool = False,
+    ):
+        """Same as the `document()` function, but using the caches of the session."""
+        if low_memory and (max_page_bytes is not None or split_modules):
+            raise ValueError("low_memory can not be combined with max_page_bytes or split_modules")
+        package = PackageWrapper(objects)
+        if include is not None or exclude is not None:
+            package.filters = NameFilter(include, exclude)
+        package.session = self
+        package.docstring_parser = self.docstring_parser
+        package.templates = self.templates
+        package.source_links = self.source_links
+        package.profiler = Profiler.current()
+        if duplicates is not None:
+            package.registry = Registry(duplicates)
+        if search_index is not None:
+            package.search_index = SearchIndex()
+        if api_hashes is not None:
+            package.api_hashes = ApiHashes()
+
+        if max_page_bytes is not None or split_modules:
+            paginator = Paginator(filename, max_page_bytes, split_modules)
+            output = paginator.paginate(package)
+            for page_filename, content in output.items():
+                _write_if_changed(page_filename, content)
+            paginator.remove_stale_pages(len(output) - 1)
+        elif low_memory:
+            package.write(filename, unload_modules)
+        else:
+            documentation = package.full_doc()
+            with open(filename, "w") as file:
+                file.write(documentation)
+
+        if search_index is not None:
+            package.search_index.save(search_index)
+        if api_hashes is not None:
+            package.api_hashes.save(api_hashes)
+
+
+class _ProfilingLoader(object):
+    """Wraps the loader of a module that is imported while a `Profiler` is active, in order to time the execution of
+    the module. The original loader is put back on the module once it has been executed."""
+
+    def __init__(self, loader, profiler: "Profiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name: str):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: types.ModuleType):
+        try:
+            self._profiler.measure_import(module.__name__, self._loader.exec_module, module)
+        finally:
+            module.__loader__ = self._loader
+            if getattr(module, "__spec__", None) is not None:
+                module.__spec__.loader = self._loader
+
+
+class _ProfilingFinder(object):
+    """Meta path finder which asks the other finders for the module spec, and wraps its loader in a
+    `_ProfilingLoader` if the module is imported in the thread where the profiler is active."""
+
+    def __init__(self, profiler: "Profiler"):
+        self.profiler = profiler
+
+    def find_spec(self, name: str, path=None, target=None):
+        if Profiler.current() is not self.profiler:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if hasattr(spec.loader, "exec_module"):
+            spec.loader = _ProfilingLoader(spec.loader, self.profiler)
+        return spec
+
+
+class _ProfileFrame(object):
+    """An entry on the call stack of a `Profiler`."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.elapsed = 0.0
+        self.children_elapsed = 0.0
+
+    @property
+    def self_elapsed(self) -> float:
+        return self.elapsed - self.children_elapsed
+
+
+class Profiler(object):
+    """Measures where the time goes when generating documentation. Use it as a context manager:
+
+    ```python
+    with Profiler() as profiler:
+        import my_package
+        document([IncludeChildren(my_package)], "README.md")
+    print(profiler.report())
+    profiler.write_collapsed("jdoc.folded")
+    ```
+
+    While the profiler is active, it records the following:
+
+    * `imports`: for each module that is imported, a tuple `(total_seconds, self_seconds, memory_bytes)`. The total
+      time includes the modules it imports in turn, and the self time does not. The memory is the increase in memory
+      allocated by Python while importing the module (including its imports), and is 0 if `memory` is False.
+    * `introspection`: for each `(operation, qualified_name, wrapper_type)`, a list `[calls, total_seconds,
+      self_seconds]`. The operations are `"children"`, `"oneliner"` (the signature) and `"render"` (the output of
+      `full_doc()`), and are recorded for everything documented with `document()` or a `DocSession`.
+    * `stacks`: for each stack of nested imports and operations, the self time in seconds. `write_collapsed()` writes
+      them in the collapsed stack format used by flame graph tools.
+
+    Only one profiler may be active at a time in each thread, and it only records what happens in the thread that
+    entered it.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.imports = OrderedDict()
+        self.introspection = OrderedDict()
+        self.stacks = OrderedDict()
+        self._stack = []
+        self._finder = _ProfilingFinder(self)
+        self._started_tracemalloc = False
+
+    @classmethod
+    def current(cls) -> "Profiler":
+        """Returns the profiler that is active in the current thread, if any."""
+        return getattr(cls._local, "profiler", None)
+
+    def __enter__(self) -> "Profiler":
+        if Profiler.current() is not None:
+            raise RuntimeError("Another profiler is already active")
+        Profiler._local.profiler = self
+        sys.meta_path.insert(0, self._finder)
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def __exit__(self, *exc_info):
+        Profiler._local.profiler = None
+        sys.meta_path.remove(self._finder)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _call(self, name: str, func, args: tuple):
+        """Calls `func(*args)` in a new frame on the stack, and returns the result and the frame."""
+        frame = _ProfileFrame(name)
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        finally:
+            frame.elapsed = time.perf_counter() - start
+            stack = ";".join(entry.name for entry in self._stack)
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + frame.self_elapsed
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1].children_elapsed += frame.elapsed
+        return result, frame
+
+    def measure_import(self, name: str, func, *args):
+        """Returns `func(*args)`, which should execute the module `name`, and records the time and memory used."""
+        memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        result, frame = self._call("import " + name, func, args)
+        memory = tracemalloc.get_traced_memory()[0] - memory_before if tracemalloc.is_tracing() else 0
+        self.imports[name] = (frame.elapsed, frame.self_elapsed, memory)
+        return result
+
+    def measure(self, operation: str, wrapper: ObjectWrapper, func, *args):
+        """Returns `func(*args)`, and records the time used as `operation` on the object wrapped by `wrapper`."""
+        name = _qualified_name(wrapper.obj) if wrapper.obj is not None else type(wrapper).__name__
+        result, frame = self._call("{} {}".format(operation, name), func, args)
+        entry = self.introspection.setdefault((operation, name, type(wrapper).__name__), [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += frame.elapsed
+        entry[2] += frame.self_elapsed
+        return result
+
+    def report(self, limit: int = None) -> str:
+        """Returns a table of the imports and a table of the introspection operations, each sorted by the total time
+        with the slowest first. If `limit` is given, only that many rows are included in each table."""
+        lines = ["Imports", "{:>10} {:>10} {:>12}  {}".format("total ms", "self ms", "memory kB", "module")]
+        imports = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (total, self_time, memory) in imports[:limit]:
+            lines.append("{:>10.2f} {:>10.2f} {:>12.1f}  {}".format(total * 1e3, self_time * 1e3, memory / 1024, name))
+
+        lines += ["", "Introspection", "{:>10} {:>10} {:>6}  {}".format("total ms", "self ms", "calls", "operation")]
+        introspection = sorted(self.introspection.items(), key=lambda item: item[1][1], reverse=True)
+        for (operation, name, wrapper_type), (calls, total, self_time) in introspection[:limit]:
+            lines.append(
+                "{:>10.2f} {:>10.2f} {:>6}  {} {} ({})".format(
+                    total * 1e3, self_time * 1e3, calls, operation, name, wrapper_type
+                )
+            )
+        return "\n".join(lines) + "\n"
+
+    def collapsed(self) -> str:
+        """Returns the recorded stacks in the collapsed stack format, with the self time of each stack in
+        microseconds."""
+        return "".join(
+            "{} {}\n".format(stack, int(round(seconds * 1e6))) for stack, seconds in self.stacks.items()
+        )
+
+    def write_collapsed(self, filename: str):
+        """Writes the output of `collapsed()` to `filename`, e.g. for use with `flamegraph.pl`."""
+        with open(filename, "w") as file:
+            file.write(self.collapsed())
+
+
+def _public_wrappers(objects: list) -> Iterable[ObjectWrapper]:
+    """Yields wrappers for the public modules, classes, functions and methods reachable from `objects`, each once.
+    Modules and classes are always followed by their children, which are selected in the same way as by `document()`
+    (including the filters, submodules and inherited members given with `IncludeChildren`)."""
+    seen = set()
+
+    def visit(wrapper):
+        if id(wrapper.obj) in seen:
+            return
+        seen.add(id(wrapper.obj))
+        yield wrapper
+        for child in wrapper.children():
+            yield from visit(child)
+
+    for obj in objects:
+        if isinstance(obj, IncludeChildren):
+            wrapper = obj.get_wrapper()
+        elif isinstance(obj, Plugin):
+            continue
+        else:
+            wrapper = ObjectWrapper.from_object(obj)
+        if isinstance(
+            wrapper, (ModuleWrapper, ClassWrapper, FunctionWrapper, MethodWrapper, BuiltinFunctionWrapper)
+        ):
+            yield from visit(wrapper)
+
+
+def check(objects: list) -> List[tuple]:
+    """Checks that all public modules, classes, functions and methods reachable from `objects` have docstrings.
+
+    `objects` may contain the same things as for `document()`. Modules and classes are always checked along with their
+    children, which are selected in the same way as when documenting them. Nothing is rendered.
+
+    Returns a list of `(qualified_name, problem)`, where `problem` is `"missing"` if the object has no docstring or
+    `"empty"` if the docstring only contains whitespace.
+    """
+    problems = []
+    for wrapper in _public_wrappers(objects):
+        doc = wrapper.obj.__doc__
+        if doc is None:
+            problems.append((_qualified_name(wrapper.obj), "missing"))
+        elif not doc.strip():
+            problems.append((_qualified_name(wrapper.obj), "empty"))
+    return problems
+
+
+def api_hashes(objects: list, filename: str = None) -> ApiHashes:
+    """Hashes the signature and docstring of all public modules, classes, functions and methods reachable from
+    `objects`, without rendering any documentation (see `ApiHashes`).
+
+    The objects are selected in the same way as for `check()`. If `filename` is given, the hashes are saved there.
+    """
+    hashes = ApiHashes()
+    for wrapper in _public_wrappers(objects):
+        hashes.add(wrapper.obj, wrapper.oneliner(), wrapper.text())
+    if filename is not None:
+        hashes.save(filename)
+    return hashes
+
+
+def document(
+    objects: list,
+    filename: str,
+    search_index: str = None,
+    docstring_parser: DocstringParser = None,
+    duplicates: str = None,
+    max_page_bytes: int = None,
+    split_modules: bool = False,
+    templates: Dict[str, str] = None,
+    api_hashes: str = None,
+    source_links: str = None,
+    include: Union[str, list] = None,
+    exclude: Union[str, list] = None,
+    low_memory: bool = False,
+    unload_modules: bool = False,
+    source_root: str = None,
+):
     """Takes a list of objects and returns a string with documentation for all of them.
 
     Each element of `objects` may either be a string (in which case it is considered a filename for a document),
@@ -529,8 +2789,52 @@ def document(objects: list, filename: str):
 
     * Instances of `Plugin` classes introduce special behaviours (see the documentation for those classes)
     * Any other object is fed into `ObjectWrapper.from_object`.
+
+    If `search_index` is given, a search index for all documented objects (see `SearchIndex`) is written to that file.
+
+    If `docstring_parser` is given, it is used to format the docstrings (see `DocstringParser`).
+
+    If `duplicates` is given, objects that occur several times in the output are only rendered once. The value
+    decides what is emitted for the later occurrences, and can be `"link"`, `"reference"` or `"copy"` (see
+    `Registry`).
+
+    If `max_page_bytes` is given or `split_modules` is True, the output is split into several pages and `filename`
+    becomes an index page linking to them (see `Paginator`). Pages whose content did not change are not rewritten.
+
+    If `templates` is given, it should be a dict from a kind of object to a template that replaces the default layout
+    for that kind of object (see `Templates`).
+
+    If `api_hashes` is given, hashes of the signature and docstring of each documented object (see `ApiHashes`) are
+    written to that file. Use `api_hashes()` to get them without rendering the documentation.
+
+    If `source_links` is given, the headings of modules, classes and functions link to their source code. It should
+    be a URL with the fields `{path}` and `{line}`, e.g. `"https://github.com/user/repo/blob/master/{path}#L{line}"`,
+    where `path` is relative to `source_root`, which defaults to the current working directory (see `SourceLinks`).
+
+    If `include` or `exclude` is given, the objects are filtered by their qualified names (see `NameFilter`). The
+    filters apply to everything in `objects` and their children, in addition to any filters given to
+    `IncludeChildren`.
+
+    If `low_memory` is True, the objects are rendered and written out one at a time, and only the headings are kept
+    for the tables of contents (see `PackageWrapper.write()`). `objects` may then be any iterable, e.g. a generator
+    which imports each module as it is needed. If `unload_modules` is also True, each module is unloaded after it is
+    rendered. This can not be combined with `max_page_bytes` or `split_modules`.
+
+    To reuse the work done between several calls, use a `DocSession` instead.
     """
-    package = PackageWrapper(objects)
-    documentation = package.full_doc()
-    with open(filename, "w") as file:
-        file.write(documentation)
+    session = DocSession(
+        docstring_parser, templates, cache_fragments=False, source_links=source_links, source_root=source_root
+    )
+    session.document(
+        objects,
+        filename,
+        search_index=search_index,
+        duplicates=duplicates,
+        max_page_bytes=max_page_bytes,
+        split_modules=split_modules,
+        api_hashes=api_hashes,
+        include=include,
+        exclude=exclude,
+        low_memory=low_memory,
+        unload_modules=unload_modules,
+    )
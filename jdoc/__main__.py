@@ -0,0 +1,186 @@
+"""
+Command line interface for jdoc
+"""
+import argparse
+import importlib
+import os
+import runpy
+import sys
+from typing import List
+
+import jdoc
+
+
+def import_object(path: str) -> object:
+    """Imports the module, class or function with the given dotted path, e.g. `package.module.Class`."""
+    parts = path.split(".")
+    for i in range(len(parts), 0, -1):
+        module_name = ".".join(parts[:i])
+        try:
+            obj = importlib.import_module(module_name)
+        except ImportError as error:
+            # Only keep looking if it was the module itself (and not one of its imports) that was not found
+            if i == 1 or not module_name.startswith(getattr(error, "name", None) or "\0"):
+                raise
+            continue
+
+        for part in parts[i:]:
+            obj = getattr(obj, part)
+        return obj
+
+
+def import_objects(paths: List[str], **options) -> List[jdoc.IncludeChildren]:
+    """Imports the objects with the given dotted paths, each wrapped in `jdoc.IncludeChildren` with the given
+    options (`inherited`, `submodules`, `include` and `exclude`)."""
+    return [jdoc.IncludeChildren(import_object(path), **options) for path in paths]
+
+
+def check(paths: List[str], **options) -> int:
+    """Runs `jdoc.check()` on the objects with the given dotted paths, and reports the problems. The options are
+    passed on to `import_objects()`."""
+    try:
+        objects = import_objects(paths, **options)
+    except (ImportError, AttributeError) as error:
+        print("jdoc: {}".format(error), file=sys.stderr)
+        return 2
+
+    problems = jdoc.check(objects)
+    for name, problem in problems:
+        print("{}: {} docstring".format(name, problem))
+
+    return 1 if problems else 0
+
+
+def hash_api(paths: List[str], output: str, **options) -> int:
+    """Runs `jdoc.api_hashes()` on the objects with the given dotted paths, and saves the hashes to `output`. The
+    options are passed on to `import_objects()`."""
+    try:
+        objects = import_objects(paths, **options)
+    except (ImportError, AttributeError) as error:
+        print("jdoc: {}".format(error), file=sys.stderr)
+        return 2
+
+    jdoc.api_hashes(objects, output)
+    return 0
+
+
+def diff(old: str, new: str) -> int:
+    """Compares two API hash files, and reports the objects that were added, removed or changed."""
+    try:
+        differences = jdoc.ApiHashes.diff(jdoc.ApiHashes.load(old), jdoc.ApiHashes.load(new))
+    except (OSError, ValueError) as error:
+        print("jdoc: {}".format(error), file=sys.stderr)
+        return 2
+
+    for name in differences["added"]:
+        print("added: {}".format(name))
+    for name in differences["removed"]:
+        print("removed: {}".format(name))
+    for name, changes in differences["changed"]:
+        print("changed: {} ({})".format(name, ", ".join(changes)))
+
+    return 1 if any(differences.values()) else 0
+
+
+def profile(config: str, output: str, limit: int = None, memory: bool = True) -> int:
+    """Runs the script `config`, which should call `jdoc.document()`, with a `jdoc.Profiler` active. Prints the
+    tables of the profiler and writes the collapsed stacks to `output`."""
+    if not os.path.isfile(config):
+        print("jdoc: no such file: {}".format(config), file=sys.stderr)
+        return 2
+
+    argv, path = sys.argv, list(sys.path)
+    sys.argv = [config]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(config)))
+    try:
+        with jdoc.Profiler(memory=memory) as profiler:
+            runpy.run_path(config, run_name="__main__")
+    finally:
+        sys.argv, sys.path[:] = argv, path
+
+    print(profiler.report(limit), end="")
+    profiler.write_collapsed(output)
+    print("\nCollapsed stacks written to {}".format(output))
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="jdoc", description=jdoc.__doc__.strip())
+    commands = parser.add_subparsers(dest="command")
+
+    # Options for selecting the objects in the same way as IncludeChildren
+    selection = argparse.ArgumentParser(add_help=False)
+    selection.add_argument("objects", nargs="+", help="dotted paths, e.g. package.module.Class")
+    selection.add_argument("--submodules", action="store_true", help="include the submodules of packages")
+    selection.add_argument(
+        "--inherited", action="store_true", help="include the methods that classes inherit from their base classes"
+    )
+    selection.add_argument(
+        "--include", action="append", metavar="PATTERN", help="qualified names to include even if they are private"
+    )
+    selection.add_argument("--exclude", action="append", metavar="PATTERN", help="qualified names to leave out")
+
+    commands.add_parser(
+        "check",
+        parents=[selection],
+        help="check that all public objects have docstrings",
+        description="Exits with status 1 if any docstrings are missing or empty, and 2 if an object can not be "
+        "imported.",
+    )
+
+    hash_parser = commands.add_parser(
+        "hash",
+        parents=[selection],
+        help="save hashes of the public API for use with jdoc diff",
+        description="Saves hashes of the signature and docstring of all public objects, without generating any "
+        "documentation.",
+    )
+    hash_parser.add_argument("-o", "--output", required=True, help="the file to save the hashes to")
+
+    diff_parser = commands.add_parser(
+        "diff",
+        help="compare two API hash files",
+        description="Lists the objects that were added, removed or changed between two files written by jdoc hash "
+        "or document(api_hashes=...). Exits with status 1 if there are any differences.",
+    )
+    diff_parser.add_argument("old", help="hashes of the old version")
+    diff_parser.add_argument("new", help="hashes of the new version")
+
+    profile_parser = commands.add_parser(
+        "profile",
+        help="profile the imports and introspection done by a documentation script",
+        description="Runs a script which calls jdoc.document(), and reports the time and memory used to import each "
+        "module, and the time used to introspect and render each documented object.",
+    )
+    profile_parser.add_argument("config", help="the script to run, e.g. generate_doc.py")
+    profile_parser.add_argument(
+        "-o", "--output", default="jdoc.folded", help="file for the collapsed stacks (default: jdoc.folded)"
+    )
+    profile_parser.add_argument("-n", "--limit", type=int, help="maximum number of rows in each table")
+    profile_parser.add_argument(
+        "--no-memory", dest="memory", action="store_false", help="do not measure memory (which slows down imports)"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command in ("check", "hash"):
+        options = {
+            "inherited": args.inherited,
+            "submodules": args.submodules,
+            "include": args.include,
+            "exclude": args.exclude,
+        }
+    if args.command == "check":
+        return check(args.objects, **options)
+    if args.command == "hash":
+        return hash_api(args.objects, args.output, **options)
+    if args.command == "diff":
+        return diff(args.old, args.new)
+    if args.command == "profile":
+        return profile(args.config, args.output, args.limit, args.memory)
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
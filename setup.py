@@ -30,6 +30,7 @@ if __name__ == "__main__":
         ],
         license="MIT",
         zip_safe=False,
+        entry_points={"console_scripts": ["jdoc = jdoc.__main__:main"]},
         project_urls={
             "Documentation": "https://github.com/jonathangjertsen/jdoc",
             "Source": "https://github.com/jonathangjertsen/jdoc",
@@ -1,5 +1,7 @@
+import importlib
 import os
 import random
+import sys
 
 import pytest
 
@@ -95,3 +97,27 @@ def output_md_filename():
     )
     yield filename
     os.remove(filename)
+
+
+@pytest.fixture()
+def output_json_filename():
+    filename = os.path.join(
+        os.path.dirname(__file__),
+        "test_output",
+        "test_output_{}.json".format(random.random()),
+    )
+    yield filename
+    if os.path.exists(filename):
+        os.remove(filename)
+
+
+@pytest.fixture()
+def importable_dir(tmpdir):
+    """A temporary directory on `sys.path`. The modules imported from it are removed from `sys.modules` afterwards."""
+    sys.path.insert(0, str(tmpdir))
+    importlib.invalidate_caches()
+    yield tmpdir
+    sys.path.remove(str(tmpdir))
+    for name, module in list(sys.modules.items()):
+        if (getattr(module, "__file__", None) or "").startswith(str(tmpdir)):
+            del sys.modules[name]
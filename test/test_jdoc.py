@@ -1,8 +1,17 @@
+import gc
+import importlib
+import itertools
+import json
+import os
+import re
 import sys
+import threading
+import weakref
 
 import pytest
 
 import jdoc
+import jdoc.__main__ as jdoc_main
 
 from . import test_module
 
@@ -244,10 +253,10 @@ def test_integration(output_md_filename):
 
     expected_out = """# Toc
 
-* `Class(*args, **kwargs)`
-    * `method(self)`
-* `Class(*args, **kwargs)`
-    * `method(self)`
+* [`Class(*args, **kwargs)`](#classargs-kwargs)
+    * [`method(self)`](#methodself)
+* [`Class(*args, **kwargs)`](#classargs-kwargs-1)
+    * [`method(self)`](#methodself-1)
 
 ---
 
@@ -267,3 +276,982 @@ def test_integration(output_md_filename):
         assert file.read().strip() == expected_out
 
     assert jdoc.PackageWrapper(objects).full_doc().strip() == expected_out
+
+
+def test_search_index_tokenize():
+    assert jdoc.SearchIndex.tokenize("The sub_module_function, x!") == [
+        "the",
+        "sub_module_function",
+        "sub",
+        "module",
+        "function",
+    ]
+
+
+@at_least_3_7
+def test_search_index(output_md_filename, output_json_filename):
+    jdoc.document(
+        [jdoc.IncludeChildren(test_module)],
+        output_md_filename,
+        search_index=output_json_filename,
+    )
+
+    with open(output_json_filename) as file:
+        index = json.load(file)
+
+    module = index["modules"]["test.test_module"]
+    assert module["objects"][:3] == [
+        ["", "testtest_module"],
+        ["Class", "classx-float"],
+        ["Class.__init__", "__init__self-x-float"],
+    ]
+    assert [module["objects"][i][0] for i in module["tokens"]["classmethod"]] == [
+        "Class.classmethod"
+    ]
+
+
+def test_search_index_compact():
+    index = jdoc.SearchIndex()
+    for i in range(10):
+        function = lambda: None
+        function.__module__ = "module"
+        function.__qualname__ = "function_{}".format(i)
+        index.add(function, "function_{}()".format(i), "Returns the number {}.".format("seven" if i % 3 else "three"))
+    tokens = index.to_dict()["modules"]["module"]["tokens"]
+
+    # Names are always indexed, while stopwords and tokens in the text of most objects are left out
+    assert "the" not in tokens
+    assert "returns" not in tokens and "number" not in tokens
+    assert tokens["function"] == [0] + [1] * 9
+    assert list(itertools.accumulate(tokens["three"])) == [0, 3, 6, 9]
+
+
+def test_search_index_incremental(output_json_filename):
+    index = jdoc.SearchIndex()
+    index.add(test_module.function, "function()", "Some text")
+    index.add(test_module.sub_module_file, "sub_module_file", "Other text")
+    index.save(output_json_filename)
+
+    # Tamper with the saved tokens to check which modules are reused
+    with open(output_json_filename) as file:
+        saved = json.load(file)
+    for module in saved["modules"].values():
+        module["tokens"] = {"tampered": [0]}
+    with open(output_json_filename, "w") as file:
+        json.dump(saved, file)
+
+    index = jdoc.SearchIndex()
+    index.add(test_module.function, "function()", "Some text")
+    index.add(test_module.sub_module_file, "sub_module_file", "Changed text")
+    index.save(output_json_filename)
+
+    with open(output_json_filename) as file:
+        modules = json.load(file)["modules"]
+    assert modules["test.test_module"]["tokens"] == {"tampered": [0]}
+    assert "changed" in modules["test.test_module.sub_module_file"]["tokens"]
+
+
+def test_docstring_parser_google():
+    text = """Does something.
+
+Args:
+    x (int): The first argument,
+        which spans two lines.
+    y: The second argument.
+
+Returns:
+    str: The result.
+
+Raises:
+    ValueError: If `x` is negative."""
+
+    assert jdoc.DocstringParser().parse(text) == jdoc.ParsedDocstring(
+        "Does something.",
+        {
+            "Arguments": [
+                ("x", "int", "The first argument, which spans two lines."),
+                ("y", "", "The second argument."),
+            ],
+            "Returns": [("", "str", "The result.")],
+            "Raises": [("", "ValueError", "If `x` is negative.")],
+        },
+    )
+
+
+def test_docstring_parser_numpy():
+    text = """Does something.
+
+Parameters
+----------
+x : int
+    The first argument.
+y
+    The second argument.
+
+Returns
+-------
+str
+    The result.
+
+Examples
+--------
+>>> something(1, 2)"""
+
+    assert jdoc.DocstringParser().parse(text) == jdoc.ParsedDocstring(
+        "Does something.\n\nExamples\n--------\n>>> something(1, 2)",
+        {
+            "Arguments": [("x", "int", "The first argument."), ("y", "", "The second argument.")],
+            "Returns": [("", "str", "The result.")],
+        },
+    )
+
+
+def test_docstring_parser_rest():
+    text = """Does something.
+
+:param int x: The first argument.
+:param y: The second argument,
+    which spans two lines.
+:type y: str
+:returns: The result.
+:rtype: str
+:raises ValueError: If `x` is negative."""
+
+    assert jdoc.DocstringParser().parse(text) == jdoc.ParsedDocstring(
+        "Does something.",
+        {
+            "Arguments": [
+                ("x", "int", "The first argument."),
+                ("y", "str", "The second argument, which spans two lines."),
+            ],
+            "Returns": [("", "str", "The result.")],
+            "Raises": [("", "ValueError", "If `x` is negative.")],
+        },
+    )
+
+
+def test_docstring_parser_render():
+    parser = jdoc.DocstringParser()
+    text = "Does something.\n\nArgs:\n    x (int): The x | y.\n\nReturns:\n    The result."
+    assert (
+        parser.render(text)
+        == """Does something.
+
+**Arguments:**
+
+| Name | Type | Description |
+| ---- | ---- | ----------- |
+| `x` | `int` | The x \\| y. |
+
+**Returns:**
+
+* The result."""
+    )
+    assert parser.parse(text) is parser.parse(text)
+    assert parser.render("Plain docstring.") == "Plain docstring."
+
+
+
+def test_docstring_parser_layout():
+    parser = jdoc.DocstringParser()
+    text = "Does something.\n\n```\nArgs:\n    not really\n```\n\nArgs:\n    x: The x.\n\nExample:\n    >>> f(1)"
+    parsed = parser.parse(text)
+    assert parsed.sections == {"Arguments": [("x", "", "The x.")]}
+    assert parsed.layout == [
+        "Does something.\n\n```\nArgs:\n    not really\n```",
+        "Arguments",
+        "Example:\n    >>> f(1)",
+    ]
+    assert parser.render(text).endswith("| `x` |  | The x. |\n\nExample:\n    >>> f(1)")
+
+
+@at_least_3_7
+def test_document_docstring_parser(output_md_filename):
+    def function(x: int):
+        """Does something.
+
+        Args:
+            x: The x.
+        """
+
+    jdoc.document([function], output_md_filename, docstring_parser=jdoc.DocstringParser())
+
+    with open(output_md_filename) as file:
+        assert file.read().strip() == (
+            "## `function(x: int)`\n\n"
+            "Does something.\n\n"
+            "**Arguments:**\n\n"
+            "| Name | Type | Description |\n"
+            "| ---- | ---- | ----------- |\n"
+            "| `x` |  | The x. |"
+        )
+
+
+@at_least_3_7
+@pytest.mark.parametrize(
+    "mode, reference",
+    [
+        ("link", "See [`function(x: int, y: str)`](#functionx-int-y-str)."),
+        ("reference", "See `test.test_module.function`."),
+    ],
+)
+def test_document_duplicates(output_md_filename, mode, reference):
+    jdoc.document(
+        [test_module.function, jdoc.IncludeChildren(test_module)],
+        output_md_filename,
+        duplicates=mode,
+    )
+
+    with open(output_md_filename) as file:
+        output = file.read()
+
+    assert output.count("This is a test function!") == 1
+    assert "## `function(x: int, y: str)`\n\n" + reference in output
+
+
+def test_document_duplicates_copy(output_md_filename):
+    objects = [
+        jdoc.IncludeChildren(test_module.Class),
+        jdoc.IncludeChildren(test_module.Class),
+        test_module.Class,
+    ]
+
+    jdoc.document(objects, output_md_filename, duplicates="copy")
+
+    with open(output_md_filename) as file:
+        assert file.read() == jdoc.PackageWrapper(objects).full_doc()
+
+
+def test_document_duplicates_more_children(output_md_filename):
+    jdoc.document([test_module.Class, jdoc.IncludeChildren(test_module)], output_md_filename, duplicates="link")
+    with open(output_md_filename) as file:
+        output = file.read()
+    assert "### `method_nodoc(self)`" in output
+    assert "See [" not in output
+
+    objects = [jdoc.IncludeChildren(test_module.Class), jdoc.IncludeChildren(test_module.Class, exclude="*.method*")]
+    jdoc.document(objects, output_md_filename, duplicates="copy")
+    with open(output_md_filename) as file:
+        assert file.read().count("method_nodoc") == 1
+
+
+def test_registry_keeps_no_objects():
+    registry = jdoc.Registry("link")
+    package = jdoc.PackageWrapper([jdoc.IncludeChildren(test_module)])
+    package.registry = registry
+    package.full_doc()
+    for name, (signature, anchor, children) in registry.rendered.items():
+        assert all(isinstance(value, (int, str)) for value in name + (signature, anchor, children))
+
+
+def test_anchors_count_markdown_headings(tmpdir, output_md_filename, output_json_filename):
+    markdown = tmpdir.join("intro.md")
+    markdown.write("## `Class(x: float)`\n")
+    jdoc.document(
+        [jdoc.Markdown(str(markdown)), test_module.Class, test_module.Class],
+        output_md_filename,
+        duplicates="link",
+        search_index=output_json_filename,
+    )
+
+    with open(output_md_filename) as file:
+        assert "See [`Class(x: float)`](#classx-float-1)." in file.read()
+    with open(output_json_filename) as file:
+        assert json.load(file)["modules"]["test.test_module"]["objects"] == [["Class", "classx-float-1"]]
+
+
+def test_registry_invalid_mode():
+    with pytest.raises(ValueError):
+        jdoc.Registry("ignore")
+
+
+@at_least_3_7
+def test_document_split_modules(tmpdir):
+    filename = str(tmpdir.join("README.md"))
+    jdoc.document(
+        [
+            jdoc.TableOfContents("Toc"),
+            jdoc.IncludeChildren(test_module),
+            jdoc.IncludeChildren(test_module.sub_module_file),
+        ],
+        filename,
+        split_modules=True,
+    )
+
+    assert sorted(tmpdir.listdir()) == [
+        tmpdir.join(name) for name in ("README.md", "README_1.md", "README_2.md", "README_3.md")
+    ]
+    assert tmpdir.join("README.md").read() == (
+        "# Pages\n\n"
+        "* [Toc](README_1.md)\n"
+        "* [`test.test_module`](README_2.md)\n"
+        "* [`test.test_module.sub_module_file`](README_3.md)\n"
+    )
+
+    toc = tmpdir.join("README_1.md").read()
+    assert "* [`test.test_module`](README_2.md#testtest_module)" in toc
+    assert "    * [`Class(x: float)`](README_2.md#classx-float)" in toc
+    assert (
+        "* [`test.test_module.sub_module_file`](README_3.md#testtest_modulesub_module_file)"
+        in toc
+    )
+    assert tmpdir.join("README_3.md").read().startswith(
+        "# `test.test_module.sub_module_file`"
+    )
+
+
+def test_document_max_page_bytes(tmpdir):
+    filename = str(tmpdir.join("README.md"))
+    objects = [jdoc.IncludeChildren(test_module)]
+    jdoc.document(objects, filename, max_page_bytes=300)
+
+    pages = sorted(str(page) for page in tmpdir.listdir() if page.basename != "README.md")
+    assert len(pages) > 1
+    contents = []
+    for page in pages:
+        with open(page) as file:
+            contents.append(file.read())
+        assert not contents[-1].startswith("####")
+    assert "\n".join(contents) == jdoc.PackageWrapper(objects).full_doc()
+
+    # Pages that did not change are not written again
+    os.utime(pages[0], (0, 0))
+    jdoc.document(objects, filename, max_page_bytes=300)
+    assert os.path.getmtime(pages[0]) == 0
+
+    # Pages left over from a build with more pages are removed
+    jdoc.document(objects, filename, max_page_bytes=100000)
+    assert sorted(page.basename for page in tmpdir.listdir()) == ["README.md", "README_1.md"]
+
+
+def test_document_max_page_bytes_docstring_headings(tmpdir):
+    class Documented(object):
+        """Summary.
+
+        ## Details
+
+        More text that makes the documentation of the class long enough to need several pages.
+        """
+
+        def method(self):
+            """Method."""
+
+    filename = str(tmpdir.join("README.md"))
+    jdoc.document([jdoc.IncludeChildren(test_module), jdoc.IncludeChildren(Documented)], filename, max_page_bytes=200)
+
+    assert "Details" not in tmpdir.join("README.md").read()
+    page = next(page.read() for page in tmpdir.listdir() if "## Details" in page.read())
+    assert page.startswith("## `Documented(")
+    assert "### `method(self)`" in page
+
+
+def test_document_max_page_bytes_duplicate_links(tmpdir):
+    filename = str(tmpdir.join("README.md"))
+    objects = [jdoc.IncludeChildren(test_module), test_module.function]
+    jdoc.document(objects, filename, max_page_bytes=150, duplicates="link")
+
+    pages = {page.basename: page.read() for page in tmpdir.listdir()}
+    target = next(name for name, page in pages.items() if "### `function(x: int, y: str)`" in page)
+    reference = next(name for name, page in pages.items() if "See [" in page)
+    assert target != reference
+    assert "See [`function(x: int, y: str)`]({}#functionx-int-y-str).".format(target) in pages[reference]
+
+
+def test_document_max_page_bytes_search_index(tmpdir):
+    filename = str(tmpdir.join("README.md"))
+    index_filename = str(tmpdir.join("index.json"))
+    jdoc.document([jdoc.IncludeChildren(test_module)], filename, max_page_bytes=300, search_index=index_filename)
+
+    with open(index_filename) as file:
+        objects = json.load(file)["modules"]["test.test_module"]["objects"]
+    assert len({page for _, _, page in objects}) > 1
+    for name, anchor, page in objects:
+        with open(str(tmpdir.join(page))) as file:
+            headings = [line.lstrip("#").strip() for line in file if line.startswith("#")]
+        assert anchor in [jdoc._anchor(heading) for heading in headings]
+
+
+def test_check():
+    def function_empty():
+        """ """
+
+    assert jdoc.check(
+        [jdoc.IncludeChildren(test_module), test_module.Class, jdoc.HorizontalLine(), function_empty]
+    ) == [
+        ("test.test_module.Class.method_nodoc", "missing"),
+        ("test.test_module.ClassNoDoc", "missing"),
+        ("test.test_module.function_nodoc", "missing"),
+        ("test.test_jdoc.test_check.<locals>.function_empty", "empty"),
+    ]
+
+    # The objects are selected in the same way as by document()
+    assert jdoc.check([jdoc.IncludeChildren(test_module, exclude="*")]) == []
+    assert jdoc.check([jdoc.IncludeChildren(test_module, submodules=True, exclude="*.Class*")]) == [
+        ("test.test_module.function_nodoc", "missing"),
+        ("test.test_module.sub_module_file.sub_module_function", "missing"),
+        ("test.test_module.sub_module_folder", "missing"),
+    ]
+    hashes = jdoc.api_hashes([jdoc.IncludeChildren(test_module, submodules=True)])
+    assert "test.test_module.sub_module_file.sub_module_function" in hashes.objects
+
+
+def test_check_command(capsys):
+    assert jdoc_main.main(["check", "test.test_module.Class.method"]) == 0
+    assert jdoc_main.main(["check", "test.test_module.Class"]) == 1
+    assert capsys.readouterr().out == "test.test_module.Class.method_nodoc: missing docstring\n"
+    assert jdoc_main.main(["check", "test.test_module.NotAClass"]) == 2
+
+    capsys.readouterr()
+    assert jdoc_main.main(["check", "test.test_module", "--submodules", "--exclude", "*.Class*"]) == 1
+    assert capsys.readouterr().out == (
+        "test.test_module.function_nodoc: missing docstring\n"
+        "test.test_module.sub_module_file.sub_module_function: missing docstring\n"
+        "test.test_module.sub_module_folder: missing docstring\n"
+    )
+    assert jdoc_main.main(["check", "test.test_module", "--exclude", "*nodoc", "--exclude", "*NoDoc"]) == 0
+
+
+def test_output_buffer():
+    buffer = jdoc.OutputBuffer()
+    for text in ["a\n", "\n", "\n", "\n\nb\n\n\n\nc", "", "\n\n\n"]:
+        buffer.write(text)
+    assert buffer.getvalue() == "a\n\nb\n\nc\n\n"
+
+
+@at_least_3_7
+def test_document_templates(output_md_filename):
+    jdoc.document(
+        [jdoc.IncludeChildren(test_module.Class)],
+        output_md_filename,
+        templates={
+            "class": "{heading} {name}\n\n{doc}\n\n{children}",
+            "method": "* `{signature}`: {doc}\n",
+        },
+    )
+
+    with open(output_md_filename) as file:
+        assert file.read() == (
+            "## test.test_module.Class\n\n"
+            "This is a test class!\n\n"
+            "* `__init__(self, x: float)`: This is a test init!\n\n"
+            "* `method(self, y: float)`: This is a test method!\n\n"
+            "* `classmethod(cls)`: This is a test classmethod!\n\n"
+            "* `staticmethod()`: This is a test staticmethod!\n\n"
+            "* `method_nodoc(self)`: \n"
+        )
+
+
+def test_templates_invalid():
+    with pytest.raises(ValueError):
+        jdoc.Templates({"class": "{unknown}"})
+    with pytest.raises(ValueError):
+        jdoc.Templates({"class": "{doc!r}"})
+    with pytest.raises(ValueError):
+        jdoc.Templates({"enum": "{doc}"})
+
+
+def test_doc_session(tmpdir, index_md_filename):
+    session = jdoc.DocSession()
+    objects = [jdoc.Markdown(index_md_filename), jdoc.TableOfContents(), jdoc.IncludeChildren(test_module)]
+    filename = str(tmpdir.join("README.md"))
+    expected = jdoc.PackageWrapper(objects).full_doc()
+
+    session.document(objects, filename)
+    assert tmpdir.join("README.md").read() == expected
+    stats = session.stats()
+    # One fragment for the module and each of its classes, methods and functions
+    assert stats["fragments"] == {"hits": 0, "misses": 10}
+    # The table of contents is made from the headings of the body, without computing any signatures again
+    assert stats["signatures"]["hits"] == 0
+
+    session.document(objects, filename)
+    assert tmpdir.join("README.md").read() == expected
+    assert session.stats()["fragments"] == {"hits": 1, "misses": 10}
+    assert session.stats()["markdown"] == {"hits": 1, "misses": 1}
+
+    session.invalidate(test_module)
+    session.document(objects, filename)
+    assert tmpdir.join("README.md").read() == expected
+    assert session.stats()["fragments"] == {"hits": 1, "misses": 20}
+
+
+def test_doc_session_invalidate_while_computing():
+    session = jdoc.DocSession()
+
+    def compute():
+        # Another thread invalidates the module while the value is being computed
+        session.invalidate(test_module)
+        return "stale"
+
+    assert session.get("signatures", test_module.Class, None, compute) == "stale"
+    assert session.get("signatures", test_module.Class, None, lambda: "fresh") == "fresh"
+
+    def render(wrapper, buffer):
+        session.invalidate("test.test_module")
+        buffer.write("stale")
+
+    wrapper = jdoc.ClassWrapper(test_module.Class)
+    session.render(wrapper, render, jdoc.OutputBuffer())
+    buffer = jdoc.OutputBuffer()
+    session.render(wrapper, lambda wrapper, buffer: buffer.write("fresh"), buffer)
+    assert buffer.getvalue() == "fresh"
+
+
+def test_doc_session_markdown_modified(tmpdir):
+    markdown = tmpdir.join("header.md")
+    markdown.write("Old")
+    session = jdoc.DocSession()
+    session.document([jdoc.Markdown(str(markdown))], str(tmpdir.join("README.md")))
+
+    markdown.write("New text")
+    session.document([jdoc.Markdown(str(markdown))], str(tmpdir.join("README.md")))
+    assert tmpdir.join("README.md").read() == "New text"
+
+
+def test_doc_session_threads(tmpdir):
+    session = jdoc.DocSession(docstring_parser=jdoc.DocstringParser())
+    objects = [jdoc.IncludeChildren(test_module), jdoc.IncludeChildren(test_module.sub_module_file)]
+    errors = []
+
+    def build(i):
+        try:
+            for _ in range(20):
+                session.document(objects, str(tmpdir.join("README_{}.md".format(i))))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=build, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    outputs = {tmpdir.join("README_{}.md".format(i)).read() for i in range(4)}
+    assert len(outputs) == 1
+
+
+@at_least_3_7
+def test_builtin_function():
+    import math
+
+    sqrt = jdoc.ObjectWrapper.from_object(math.sqrt)
+    assert type(sqrt) is jdoc.BuiltinFunctionWrapper
+    assert sqrt.oneliner() == "sqrt(x, /)"
+    assert sqrt.text() == "Return the square root of x."
+
+    log = jdoc.ObjectWrapper.from_object(math.log)
+    assert log.oneliner() == "log(x, [base=math.e])"
+    assert log.text().startswith("Return the logarithm of x to the given base.")
+
+    assert math.sqrt in [child.obj for child in jdoc.ModuleWrapper(math).children()]
+
+
+@at_least_3_7
+def test_builtin_class():
+    class_ = jdoc.ClassWrapper(str)
+    assert class_.oneliner() == "str(*args, **kwargs)"
+
+    join = next(child for child in class_.children() if child.obj is str.join)
+    assert type(join) is jdoc.BuiltinMethodWrapper
+    assert join.oneliner() == "join(self, iterable, /)"
+
+    maketrans = next(child for child in class_.children() if child.obj.__name__ == "maketrans")
+    assert maketrans.oneliner().startswith("maketrans(")
+
+
+def test_method_wrapping_builtin_class():
+    class Wrapping(object):
+        """Like `__class_getitem__ = classmethod(types.GenericAlias)`."""
+
+        make = staticmethod(dict)
+        other = classmethod(dict)
+
+    children = jdoc.IncludeChildren(Wrapping).get_wrapper().children()
+    assert [type(child) for child in children] == [jdoc.BuiltinMethodWrapper] * 2
+    assert all(child.oneliner().startswith("dict(") for child in children)
+    assert jdoc.FunctionWrapper(dict).oneliner().startswith("dict(")
+
+
+def test_builtin_signature_from_doc():
+    class ExtensionFunction(object):
+        """Looks like a function from a pybind11 module."""
+
+        __name__ = "function"
+        __text_signature__ = None
+        __doc__ = "function(self: module.Class, x: Dict[str, int] = {'a': 1}) -> int\n\nDoes something."
+
+    wrapper = jdoc.BuiltinFunctionWrapper(ExtensionFunction())
+    assert wrapper.oneliner() == "function(self: module.Class, x: Dict[str, int] = {'a': 1}) -> int"
+    assert wrapper.text() == "Does something."
+    assert jdoc._builtin_signature(ExtensionFunction(), skip_first=True) == (
+        "(x: Dict[str, int] = {'a': 1}) -> int"
+    )
+
+    ExtensionFunction.__doc__ = "Has no signature."
+    assert wrapper.oneliner() == "function(...)"
+
+
+def test_profiler(importable_dir, output_md_filename):
+    importable_dir.join("profiled_module.py").write(
+        '"""A module."""\nimport json\n\n\ndef function(x):\n    """Doc."""\n'
+    )
+    with jdoc.Profiler() as profiler:
+        import profiled_module
+
+        jdoc.document([jdoc.IncludeChildren(profiled_module)], output_md_filename)
+
+    assert type(profiled_module.__loader__) is not jdoc._ProfilingLoader
+    assert jdoc.Profiler.current() is None
+    total, self_time, memory = profiler.imports["profiled_module"]
+    assert total >= self_time >= 0
+    assert memory > 0
+
+    assert profiler.introspection[("oneliner", "profiled_module.function", "FunctionWrapper")][0] == 1
+    assert ("children", "profiled_module", "ModuleWrapper") in profiler.introspection
+    assert "render profiled_module;render profiled_module.function" in profiler.stacks
+
+    report = profiler.report(limit=1)
+    assert report.startswith("Imports\n")
+    assert "profiled_module" in report
+    for line in profiler.collapsed().splitlines():
+        stack, microseconds = line.rsplit(" ", 1)
+        assert int(microseconds) >= 0
+
+
+def test_profiler_other_thread(tmpdir, output_md_filename):
+    def document():
+        import test.test_module
+
+        jdoc.DocSession().document([test.test_module.Class], str(tmpdir.join("other.md")))
+
+    with jdoc.Profiler() as profiler:
+        thread = threading.Thread(target=document)
+        thread.start()
+        thread.join()
+        assert jdoc.Profiler.current() is profiler
+        jdoc.document([test_module.function_nodoc], output_md_filename)
+
+    names = {name for _, name, _ in profiler.introspection}
+    assert "test.test_module.function_nodoc" in names
+    assert not any(name.startswith("test.test_module.Class") for name in names)
+
+
+def test_profile_command(tmpdir, capsys):
+    config = tmpdir.join("generate_doc.py")
+    config.write(
+        "import jdoc\n"
+        "import test.test_module\n"
+        "jdoc.document([test.test_module.Class], {!r})\n".format(str(tmpdir.join("out.md")))
+    )
+    output = str(tmpdir.join("out.folded"))
+
+    assert jdoc_main.main(["profile", str(config), "-o", output, "--no-memory"]) == 0
+    assert "render test.test_module.Class (ClassWrapper)" in capsys.readouterr().out
+    with open(output) as file:
+        assert "\nrender test.test_module.Class;oneliner test.test_module.Class " in file.read()
+
+    assert jdoc_main.main(["profile", str(tmpdir.join("missing.py"))]) == 2
+
+
+def test_api_hashes(output_md_filename, output_json_filename):
+    jdoc.document([jdoc.IncludeChildren(test_module.Class)], output_md_filename, api_hashes=output_json_filename)
+    documented = jdoc.ApiHashes.load(output_json_filename)
+    assert sorted(documented["objects"]) == [
+        "test.test_module.Class",
+        "test.test_module.Class.__init__",
+        "test.test_module.Class.classmethod",
+        "test.test_module.Class.method",
+        "test.test_module.Class.method_nodoc",
+        "test.test_module.Class.staticmethod",
+    ]
+
+    hashes = jdoc.api_hashes([test_module.Class])
+    assert hashes.to_dict() == documented
+
+    class_hash = hashes.objects["test.test_module.Class"]
+    hashes.add(test_module.Class, "Class(x: int)", " This is a\n test class! ")
+    assert hashes.objects["test.test_module.Class"] == [jdoc.ApiHashes._hash("Class(x: int)"), class_hash[1]]
+    hashes.add(test_module.function, "function()", "")
+    del hashes.objects["test.test_module.Class.method_nodoc"]
+
+    assert jdoc.ApiHashes.diff(documented, hashes.to_dict()) == {
+        "added": ["test.test_module.function"],
+        "removed": ["test.test_module.Class.method_nodoc"],
+        "changed": [("test.test_module.Class", ["signature"])],
+    }
+
+
+def test_diff_command(tmpdir, capsys):
+    old = str(tmpdir.join("old.json"))
+    new = str(tmpdir.join("new.json"))
+    assert jdoc_main.main(["hash", "test.test_module.Class", "-o", old]) == 0
+    assert jdoc_main.main(["hash", "test.test_module.Class", "-o", new]) == 0
+    assert jdoc_main.main(["diff", old, new]) == 0
+
+    assert jdoc_main.main(["hash", "test.test_module", "-o", new]) == 0
+    capsys.readouterr()
+    assert jdoc_main.main(["diff", old, new]) == 1
+    output = capsys.readouterr().out
+    assert "added: test.test_module\n" in output
+    assert "added: test.test_module.function\n" in output
+    assert "removed" not in output
+
+    assert jdoc_main.main(["diff", old, str(tmpdir.join("missing.json"))]) == 2
+
+
+def test_source_links(output_md_filename, monkeypatch):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    monkeypatch.chdir(root)
+    url = "https://example.com/{path}#L{line}"
+    jdoc.document([jdoc.IncludeChildren(test_module)], output_md_filename, source_links=url)
+    with open(output_md_filename) as file:
+        lines = file.read().splitlines()
+    assert lines[0] == "# [`test.test_module`](https://example.com/test/test_module/__init__.py#L1)"
+    assert "### [`Class(x: float)`](https://example.com/test/test_module/__init__.py#L5)" in lines
+    assert "#### [`method(self, y: float)`](https://example.com/test/test_module/__init__.py#L11)" in lines
+    assert "### [`function(x: int, y: str)`](https://example.com/test/test_module/__init__.py#L30)" in lines
+
+    parsed = []
+    index = jdoc.SourceLinks.index
+    monkeypatch.setattr(
+        jdoc.SourceLinks, "index", staticmethod(lambda filename: parsed.append(filename) or index(filename))
+    )
+    session = jdoc.DocSession(source_links=url)
+    session.document([jdoc.IncludeChildren(test_module)], output_md_filename)
+    session.document([jdoc.IncludeChildren(test_module.Class)], output_md_filename)
+    assert len(parsed) == 1
+
+    assert jdoc.SourceLinks(url).link(len) is None
+    assert jdoc.SourceLinks.index(test_module.__file__)["Class.method"] == 11
+
+    monkeypatch.chdir(os.path.dirname(root))
+    jdoc.document([test_module.Class], output_md_filename, source_links=url, source_root=os.path.join(root, "test"))
+    with open(output_md_filename) as file:
+        assert file.read().startswith("## [`Class(x: float)`](https://example.com/test_module/__init__.py#L5)")
+
+
+def test_inherited_members(output_md_filename):
+    class Base(object):
+        def method(self):
+            """Base method."""
+
+        def overridden(self):
+            """Base version."""
+
+        def _private(self):
+            """Private."""
+
+    class First(Base):
+        """First subclass."""
+
+        def overridden(self):
+            """First version."""
+
+    class Second(Base):
+        """Second subclass."""
+
+    wrapper = jdoc.IncludeChildren(First).get_wrapper()
+    assert [child.obj.__name__ for child in wrapper.children()] == ["overridden"]
+
+    wrapper = jdoc.IncludeChildren(First, inherited=True).get_wrapper()
+    assert [(child.obj.__name__, child.inherited_from) for child in wrapper.children()] == [
+        ("overridden", None),
+        ("method", Base),
+    ]
+    assert type(wrapper.children()[1]) is jdoc.MethodWrapper
+
+    session = jdoc.DocSession(cache_fragments=False)
+    session.document(
+        [jdoc.IncludeChildren(First, inherited=True), jdoc.IncludeChildren(Second, inherited=True)],
+        output_md_filename,
+    )
+    assert session.stats()["fragments"] == {"hits": 1, "misses": 2}
+    with open(output_md_filename) as file:
+        assert file.read().count("Base method.") == 2
+
+    jdoc.document([jdoc.IncludeChildren(Second, inherited="reference")], output_md_filename)
+    with open(output_md_filename) as file:
+        assert "### `overridden(self)`\n\nInherited from `test.test_jdoc.test_inherited_members.<locals>.Base`." in (
+            file.read()
+        )
+
+    with pytest.raises(ValueError):
+        jdoc.IncludeChildren(First, inherited="link")
+
+
+def test_inherited_members_invalidate(importable_dir, output_md_filename):
+    importable_dir.join("base_mod.py").write('class Base(object):\n    def method(self):\n        """Old doc."""\n')
+    importable_dir.join("sub_mod.py").write('import base_mod\n\n\nclass Sub(base_mod.Base):\n    """Sub."""\n')
+    import base_mod
+    import sub_mod
+
+    session = jdoc.DocSession()
+    session.document([jdoc.IncludeChildren(sub_mod.Sub, inherited=True)], output_md_filename)
+    base_mod.Base.method.__doc__ = "New doc."
+    session.invalidate(base_mod)
+    session.document([jdoc.IncludeChildren(sub_mod.Sub, inherited=True)], output_md_filename)
+
+    with open(output_md_filename) as file:
+        output = file.read()
+    assert "New doc." in output
+    assert "Old doc." not in output
+
+
+def test_submodules_invalidate(importable_dir, output_md_filename):
+    package = importable_dir.mkdir("session_package")
+    package.join("__init__.py").write('"""Package."""\n')
+    package.join("sub.py").write('def function():\n    """Old doc."""\n')
+    import session_package
+
+    session = jdoc.DocSession()
+    objects = [jdoc.IncludeChildren(session_package, submodules=True)]
+    session.document(objects, output_md_filename)
+
+    package.join("sub.py").write('def function():\n    """Newer doc."""\n')
+    del sys.modules["session_package.sub"]
+    importlib.invalidate_caches()
+    session.invalidate("session_package.sub")
+    session.document(objects, output_md_filename)
+
+    with open(output_md_filename) as file:
+        output = file.read()
+    assert "Newer doc." in output
+    assert "Old doc." not in output
+
+
+def test_name_filter():
+    filters = jdoc.NameFilter(include="pkg.*._private", exclude=["pkg.internal*", re.compile(r"pkg\.\w+\.skip_")])
+    assert filters.excluded("pkg.internal")
+    assert filters.excluded("pkg.internal.Class.method")
+    assert filters.excluded("pkg.module.skip_this")
+    assert not filters.excluded("pkg.module.function")
+    assert filters.included("pkg.module.Class._private")
+    assert not filters.included("pkg.module._other")
+
+    combined = jdoc.NameFilter(exclude="other.*").combine(filters)
+    assert combined.excluded("other.x") and combined.excluded("pkg.internal")
+    assert combined.included("pkg.module._private")
+    assert jdoc.NameFilter(exclude="a*") == jdoc.NameFilter(exclude=["a*"])
+
+    filters = jdoc.NameFilter(exclude=[re.compile(r"pkg\.foo", re.IGNORECASE), "other.*"])
+    assert filters.excluded("PKG.Foo.bar") and filters.excluded("other.x")
+    assert not filters.excluded("OTHER.x")
+
+
+def test_filters_and_submodules(importable_dir, output_md_filename):
+    package = importable_dir.mkdir("filtered_package")
+    package.join("__init__.py").write('"""Package."""\n')
+    package.join("public.py").write(
+        '"""Public."""\n\n\ndef function():\n    """Function."""\n\n\n'
+        'def _private():\n    """Private."""\n\n\ndef skipped():\n    """Skipped."""\n'
+    )
+    package.join("excluded.py").write('"""Excluded."""\nraise ImportError("should not be imported")\n')
+    package.join("_hidden.py").write('"""Hidden."""\n')
+    import filtered_package
+
+    jdoc.document(
+        [jdoc.IncludeChildren(filtered_package, submodules=True, include="*._private")],
+        output_md_filename,
+        exclude=["filtered_package.excluded", "*.skipped"],
+    )
+    with open(output_md_filename) as file:
+        output = file.read()
+
+    assert "## `filtered_package.public`" in output
+    assert "`function()`" in output
+    assert "`_private()`" in output
+    assert "skipped" not in output
+    assert "Hidden" not in output
+    assert "Excluded" not in output
+
+    jdoc.document([test_module.Class, test_module.function], output_md_filename, exclude="test.*.Class")
+    with open(output_md_filename) as file:
+        assert file.read().startswith("## `function(x: int, y: str)`")
+
+
+def test_table_of_contents_options(tmpdir, output_md_filename):
+    from .test_module import sub_module_file
+
+    markdown = tmpdir.join("intro.md")
+    markdown.write("# Intro\n\n## `Class(x: float)`\n\n```\n# Not a heading\n```\n")
+    jdoc.document(
+        [
+            jdoc.Markdown(str(markdown)),
+            jdoc.TableOfContents("Modules", max_depth=1),
+            jdoc.IncludeChildren(test_module),
+            jdoc.TableOfContents(None, module=sub_module_file),
+            jdoc.IncludeChildren(sub_module_file),
+            jdoc.TableOfContents("Everything"),
+        ],
+        output_md_filename,
+    )
+    with open(output_md_filename) as file:
+        output = file.read()
+
+    assert (
+        "# Modules\n\n"
+        "* [`test.test_module`](#testtest_module)\n"
+        "* [`test.test_module.sub_module_file`](#testtest_modulesub_module_file)\n\n"
+    ) in output
+    assert "\n\n* [`sub_module_function()`](#sub_module_function)\n\n" in output
+    # The anchor of the class heading is counted after the heading with the same text in the Markdown file
+    assert "# Everything\n\n* [`test.test_module`](#testtest_module)\n    * [`Class(x: float)`](#classx-float-1)\n" in (
+        output
+    )
+    assert "        * [`method(self, y: float)`](#methodself-y-float)\n" in output
+
+
+def test_low_memory(tmpdir, index_md_filename):
+    from .test_module import sub_module_file
+
+    objects = [
+        jdoc.Markdown(index_md_filename),
+        jdoc.TableOfContents("Toc"),
+        jdoc.HorizontalLine(),
+        jdoc.IncludeChildren(test_module),
+        jdoc.Indent(),
+        test_module.function,
+        jdoc.Dedent(),
+        jdoc.IncludeChildren(sub_module_file),
+        jdoc.TableOfContents("Modules", max_depth=1),
+    ]
+    jdoc.document(objects, str(tmpdir.join("normal.md")))
+    jdoc.document(iter(objects), str(tmpdir.join("low_memory.md")), low_memory=True)
+    assert tmpdir.join("low_memory.md").read() == tmpdir.join("normal.md").read()
+
+    with pytest.raises(ValueError):
+        jdoc.document(objects, str(tmpdir.join("pages.md")), low_memory=True, split_modules=True)
+
+
+def test_low_memory_unload_modules(importable_dir):
+    package = importable_dir.mkdir("unloaded_package")
+    package.join("__init__.py").write('"""Package."""\n')
+    for i in range(3):
+        package.join("module_{}.py".format(i)).write(
+            '"""Module {0}."""\n\n\nclass Class{0}(object):\n    def method(self):\n        """Method."""\n'.format(i)
+        )
+
+    references = []
+
+    def objects():
+        yield jdoc.TableOfContents()
+        for i in range(3):
+            module = importlib.import_module("unloaded_package.module_{}".format(i))
+            references.append(weakref.ref(module))
+            yield jdoc.IncludeChildren(module)
+
+    jdoc.document(
+        objects(),
+        str(importable_dir.join("README.md")),
+        low_memory=True,
+        unload_modules=True,
+    )
+
+    gc.collect()
+    assert len(references) == 3
+    assert all(reference() is None for reference in references)
+    output = importable_dir.join("README.md").read()
+    assert "* [`unloaded_package.module_2`](#unloaded_packagemodule_2)\n" in output
+    assert "# `unloaded_package.module_2`" in output
+    assert "### `method(self)`" in output